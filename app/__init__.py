@@ -1,8 +1,12 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
+from flask_caching import Cache
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
 from config import config
 
 # ===============================
@@ -11,6 +15,7 @@ from config import config
 db = SQLAlchemy()
 login_manager = LoginManager()
 migrate = Migrate()
+cache = Cache()
 
 
 def create_app(config_name=None):
@@ -28,17 +33,20 @@ def create_app(config_name=None):
     os.makedirs(app.instance_path, exist_ok=True)
 
     # Load configuration
-    app.config.from_object(config[config_name])
+    config_class = config[config_name]
+    app.config.from_object(config_class)
 
     # Run production-only checks if defined
-    if hasattr(config[config_name], "init_app"):
-        config[config_name].init_app(app)
+    init_config = getattr(config_class, "init_app", None)
+    if init_config:
+        init_config(app)
 
     # ===============================
     # Initialize extensions
     # ===============================
     db.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), "migrations"))
+    cache.init_app(app)
 
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
@@ -50,6 +58,10 @@ def create_app(config_name=None):
     # ===============================
     from app.models import User
 
+    # Flask-Login stores the result on g for the request, so this runs at most
+    # once per request; session.get also short-circuits on the identity map.
+    # Users are not cached across requests: a detached User would break the
+    # lazy relationships templates read from current_user.
     @login_manager.user_loader
     def load_user(user_id):
         return db.session.get(User, int(user_id))
@@ -74,66 +86,120 @@ def create_app(config_name=None):
     app.jinja_env.globals["calculate_sla_status"] = calculate_sla_status
 
     # ===============================
-    # DB init (DEV ONLY)
+    # DB init
     # ===============================
-    with app.app_context():
-        db.create_all()
-
-        if config_name == "production":
-            from app.models import User
-            if not User.query.first():
-                admin = User(
-                    name="Admin",
-                    email="admin@example.com",
-                    role="admin"
-                )
-                admin.set_password("admin123")
-
-                db.session.add(admin)
-                db.session.commit()
-
-                print("✔ Production admin created")
-    # seed demo users only in development
-    if config_name != "production":
+    @app.cli.command("init-db")
+    def init_db_command():
+        """Create tables and seed initial users"""
+        init_database(production=config_name == "production")
+
+    # Bootstrap at most once per process and database: repeated factory
+    # calls and the Werkzeug reloader child (which inherits the environment)
+    # skip the create_all reflection and seed lookup. In-memory SQLite gives
+    # every app its own empty database, so those are always bootstrapped.
+    db_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+    in_memory = _is_in_memory_sqlite(db_uri)
+    if app.config.get("AUTO_INIT_DB") and (in_memory or os.environ.get("SERVCORE_DB_INITIALIZED") != db_uri):
         with app.app_context():
-            init_db()
-    elif config_name == "development":
-        with app.app_context():
-            db.create_all()
-            init_db()
+            init_database(production=config_name == "production")
+        if not in_memory:
+            os.environ["SERVCORE_DB_INITIALIZED"] = db_uri
 
     return app
 
 
-def init_db():
+def _is_in_memory_sqlite(db_uri):
     """
-    Seed database with initial users (DEV ONLY)
+    Check whether a database URI names a private in-memory SQLite database
+
+    Args:
+        db_uri: SQLAlchemy database URI
+
+    Returns:
+        bool: True for sqlite:// and sqlite:///:memory: style URIs
+    """
+    url = make_url(db_uri)
+    if url.get_backend_name() != "sqlite":
+        return False
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def init_database(production=False):
+    """
+    Create tables and seed initial users
+
+    Args:
+        production: Seed a single admin instead of the demo users
     """
     from app.models import User
 
-    # Do not reseed if admin already exists
-    if User.query.filter_by(email="admin@example.com").first():
+    # Tables created here already match the models, so the database starts
+    # at the latest migration; existing databases move with `flask db upgrade`
+    fresh = not db.inspect(db.engine).has_table("tickets")
+    db.create_all()
+    if fresh:
+        _stamp_migrations_head()
+
+    if not production:
+        init_db()
         return
 
-    admin = User(name="Admin User", email="admin@example.com", role="admin")
-    admin.set_password("admin123")
+    if not User.query.first():
+        admin = User(
+            name="Admin",
+            email="admin@example.com",
+            role="admin"
+        )
+        admin.set_password("admin123")
 
-    agent1 = User(name="Agent One", email="agent1@example.com", role="agent")
-    agent1.set_password("agent123")
+        db.session.add(admin)
+        db.session.commit()
 
-    agent2 = User(name="Agent Two", email="agent2@example.com", role="agent")
-    agent2.set_password("agent123")
+        print("✔ Production admin created")
 
-    user1 = User(name="John Doe", email="user1@example.com", role="user")
-    user1.set_password("user123")
 
-    user2 = User(name="Jane Smith", email="user2@example.com", role="user")
-    user2.set_password("user123")
+def _stamp_migrations_head():
+    """
+    Record the latest migration as applied to the current database
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from flask import current_app
+
+    script = ScriptDirectory(current_app.extensions["migrate"].directory)
+    with db.engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(script, "head")
+
+
+def init_db():
+    """
+    Seed database with initial users (DEV ONLY)
+    """
+    from app.models import User
 
-    user3 = User(name="Bob Johnson", email="user3@example.com", role="user")
-    user3.set_password("user123")
+    # Do not reseed if admin already exists
+    if db.session.execute(select(User.id).filter_by(email="admin@example.com")).scalar():
+        return
 
-    db.session.add_all([admin, agent1, agent2, user1, user2, user3])
+    seed_users = [
+        ("Admin User", "admin@example.com", "admin", "admin123"),
+        ("Agent One", "agent1@example.com", "agent", "agent123"),
+        ("Agent Two", "agent2@example.com", "agent", "agent123"),
+        ("John Doe", "user1@example.com", "user", "user123"),
+        ("Jane Smith", "user2@example.com", "user", "user123"),
+        ("Bob Johnson", "user3@example.com", "user", "user123"),
+    ]
+
+    # pbkdf2 releases the GIL, so the hashes are computed in parallel
+    with ThreadPoolExecutor(max_workers=len(seed_users)) as executor:
+        password_hashes = list(executor.map(User.hash_password, [password for *_, password in seed_users]))
+
+    users = [
+        User(name=name, email=email, role=role, password_hash=password_hash)
+        for (name, email, role, _), password_hash in zip(seed_users, password_hashes)
+    ]
+
+    db.session.add_all(users)
     db.session.commit()
 
     print("✔ Database seeded with default users")
@@ -1,49 +1,59 @@
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import render_template, redirect, url_for, flash, request, abort, Response
 from flask_login import login_required, current_user
 from app.admin import admin_bp
 from app.auth.decorators import role_required
-from app.models import User, AssignmentRequest, Ticket
-from app import db
-from datetime import datetime
-from app.admin.services import (
-    get_overview_stats,
-    get_tickets_by_status,
-    get_tickets_by_priority,
-    get_tickets_by_category,
-    get_agent_performance,
-    get_resolution_time_trend,
-    get_recent_activity
+from app.models import (
+    User,
+    AssignmentRequest,
+    Ticket,
+    STAFF_ROLES,
+    RESOLVED_STATUSES,
+    strict_loading,
+    ticket_is_active,
+    active_tickets,
+    request_now
 )
-import json
+from app.admin.utils import invalidate_pending_assignment_count
+from app import db
+from sqlalchemy import func, exists, and_
+from sqlalchemy.orm import contains_eager, joinedload
+from app.admin.services import get_dashboard_data, invalidate_dashboard_cache, DASHBOARD_CACHE_TIMEOUT
+from app.services.user_service import invalidate_assignable_agents
+from app.services.dashboard_cache import bump_tickets_version
+from app.tickets.services import update_ticket_status_bulk
+import orjson
 
 
 @admin_bp.route('/dashboard')
 @role_required('admin')
 def dashboard():
-    """Admin analytics dashboard"""
-    # Get all statistics
-    overview = get_overview_stats()
-    status_data = get_tickets_by_status()
-    priority_data = get_tickets_by_priority()
-    category_data = get_tickets_by_category()
-    agent_performance = get_agent_performance()
-    trend_data = get_resolution_time_trend(30)
-    recent_activity = get_recent_activity(20)
-
-    # Convert data to JSON for charts
-    status_json = json.dumps(status_data)
-    priority_json = json.dumps(priority_data)
-    category_json = json.dumps(category_data)
-    trend_json = json.dumps(trend_data)
+    """Admin analytics dashboard (charts load from dashboard_data)"""
+    data = get_dashboard_data()
 
     return render_template('admin/dashboard.html',
-                           overview=overview,
-                           status_data=status_json,
-                           priority_data=priority_json,
-                           category_data=category_json,
-                           trend_data=trend_json,
-                           agent_performance=agent_performance,
-                           recent_activity=recent_activity)
+                           overview=data['overview'],
+                           agent_performance=data['agent_performance'],
+                           recent_activity=data['recent_activity'])
+
+
+@admin_bp.route('/dashboard.json')
+@role_required('admin')
+def dashboard_data():
+    """Chart series for the admin dashboard as JSON"""
+    data = get_dashboard_data()
+
+    payload = {
+        'status_data': data['status_data'],
+        'priority_data': data['priority_data'],
+        'category_data': data['category_data'],
+        'trend_data': data['trend_data']
+    }
+
+    response = Response(orjson.dumps(payload), mimetype='application/json')
+    response.cache_control.private = True
+    response.cache_control.max_age = DASHBOARD_CACHE_TIMEOUT
+    response.add_etag()
+    return response.make_conditional(request)
 
 
 @admin_bp.route('/users')
@@ -80,6 +90,8 @@ def create_user():
             errors['password'] = 'Password is required'
         elif len(password) < 6:
             errors['password'] = 'Password must be at least 6 characters'
+        elif len(password) > 128:
+            errors['password'] = 'Password must be less than 128 characters'
 
         if role not in ['user', 'agent', 'admin']:
             errors['role'] = 'Invalid role'
@@ -98,6 +110,8 @@ def create_user():
 
         db.session.add(user)
         db.session.commit()
+        invalidate_dashboard_cache()
+        invalidate_assignable_agents()
 
         flash(f'User {name} created successfully', 'success')
         return redirect(url_for('admin.list_users'))
@@ -134,6 +148,8 @@ def edit_user(id):
 
         if password and len(password) < 6:
             errors['password'] = 'Password must be at least 6 characters'
+        elif len(password) > 128:
+            errors['password'] = 'Password must be less than 128 characters'
 
         if role not in ['user', 'agent', 'admin']:
             errors['role'] = 'Invalid role'
@@ -157,6 +173,8 @@ def edit_user(id):
             user.set_password(password)
 
         db.session.commit()
+        invalidate_dashboard_cache()
+        invalidate_assignable_agents()
 
         flash(f'User {name} updated successfully', 'success')
         return redirect(url_for('admin.list_users'))
@@ -175,15 +193,18 @@ def delete_user(id):
         flash('You cannot delete your own account', 'error')
         return redirect(url_for('admin.list_users'))
 
-    # Check for assigned tickets
-    assigned_tickets = Ticket.query.filter_by(assigned_to=id).count()
-    if assigned_tickets > 0:
+    # Check for assigned tickets (count only when there are any, for the message)
+    has_assigned_tickets = db.session.query(exists().where(Ticket.assigned_to == id)).scalar()
+    if has_assigned_tickets:
+        assigned_tickets = Ticket.query.filter_by(assigned_to=id).count()
         flash(f'Cannot delete user. User has {assigned_tickets} assigned tickets. Reassign them first.', 'error')
         return redirect(url_for('admin.list_users'))
 
     # Delete user
     db.session.delete(user)
     db.session.commit()
+    invalidate_dashboard_cache()
+    invalidate_assignable_agents()
 
     flash(f'User {user.name} deleted successfully', 'success')
     return redirect(url_for('admin.list_users'))
@@ -194,22 +215,22 @@ def delete_user(id):
 def assign_tickets():
     """Ticket assignment interface"""
     # Get unassigned tickets
-    unassigned_tickets = Ticket.query.filter_by(assigned_to=None).order_by(Ticket.created_at.desc()).all()
-
-    # Get all agents with workload
-    agents = User.query.filter(User.role.in_(['agent', 'admin'])).all()
-
-    agent_workload = []
-    for agent in agents:
-        workload = Ticket.query.filter_by(assigned_to=agent.id).count()
-        agent_workload.append({
-            'id': agent.id,
-            'name': agent.name,
-            'workload': workload
-        })
+    unassigned_tickets = active_tickets().options(*strict_loading()) \
+        .filter_by(assigned_to=None).order_by(Ticket.created_at.desc()).all()
+
+    # Get all agents with workload (soft-deleted tickets don't count), least loaded first
+    workload = func.count(Ticket.id).label('workload')
+    rows = db.session.query(User.id, User.name, workload) \
+        .outerjoin(Ticket, and_(Ticket.assigned_to == User.id, ticket_is_active())) \
+        .filter(User.role.in_(STAFF_ROLES)) \
+        .group_by(User.id, User.name) \
+        .order_by(workload, User.id) \
+        .all()
 
-    # Sort by workload
-    agent_workload.sort(key=lambda x: x['workload'])
+    agent_workload = [
+        {'id': row.id, 'name': row.name, 'workload': row.workload}
+        for row in rows
+    ]
 
     return render_template('admin/assign.html',
                            unassigned_tickets=unassigned_tickets,
@@ -220,7 +241,7 @@ def assign_tickets():
 @role_required('admin')
 def assign_ticket_action(ticket_id):
     """Assign ticket to agent"""
-    ticket = Ticket.query.get_or_404(ticket_id)
+    ticket = active_tickets().filter(Ticket.id == ticket_id).first_or_404()
 
     agent_id = request.form.get('agent_id')
 
@@ -230,34 +251,66 @@ def assign_ticket_action(ticket_id):
         return redirect(url_for('admin.assign_tickets'))
 
     agent = User.query.get(agent_id)
-    if not agent or agent.role not in ['agent', 'admin']:
+    if not agent or agent.role not in STAFF_ROLES:
         flash('Invalid agent selected', 'error')
         return redirect(url_for('admin.assign_tickets'))
 
     # Assign ticket
+    previous_assignee = ticket.assigned_to
     ticket.assigned_to = agent.id
     ticket.status = 'IN_PROGRESS'
     AssignmentRequest.query.filter(
         AssignmentRequest.ticket_id == ticket.id,
         AssignmentRequest.status == 'PENDING'
-    ).update({'status': 'REJECTED'})
+    ).update({'status': 'REJECTED'}, synchronize_session=False)
 
     db.session.commit()
+    invalidate_pending_assignment_count()
+    invalidate_dashboard_cache()
+    bump_tickets_version(ticket.created_by, previous_assignee, agent.id)
 
     flash(f'Ticket #{ticket.id} assigned to {agent.name}', 'success')
     return redirect(url_for('admin.assign_tickets'))
 
+@admin_bp.route('/tickets/close', methods=['POST'])
+@role_required('admin')
+def bulk_close_tickets():
+    """Close the resolved tickets selected on the ticket list"""
+    ticket_ids = request.form.getlist('ticket_ids', type=int)
+    if not ticket_ids:
+        flash('Select at least one resolved ticket to close', 'error')
+        return redirect(url_for('tickets.list_tickets', status='RESOLVED'))
+
+    result = update_ticket_status_bulk(ticket_ids, 'CLOSED', current_user)
+
+    if result['updated']:
+        invalidate_dashboard_cache()
+        bump_tickets_version(*result['affected_users'])
+        flash(f"Closed {len(result['updated'])} ticket(s)", 'success')
+
+    for ticket_id, error in sorted(result['errors'].items()):
+        flash(f'Ticket #{ticket_id} not closed: {error}', 'error')
+
+    return redirect(url_for('tickets.list_tickets', status='RESOLVED'))
+
+
 @admin_bp.route('/assignment-requests')
 @role_required('admin')
 def assignment_requests():
     if not current_user.is_admin():
         abort(403)
 
-    requests = AssignmentRequest.query.filter_by(status='PENDING') \
+    # The ticket join filters out soft-deleted tickets and also loads them
+    requests = AssignmentRequest.query.options(
+        contains_eager(AssignmentRequest.ticket),
+        joinedload(AssignmentRequest.agent),
+        *strict_loading()
+    ).join(AssignmentRequest.ticket) \
+        .filter(AssignmentRequest.status == 'PENDING', ticket_is_active()) \
         .order_by(AssignmentRequest.created_at.asc()) \
         .all()
 
-    return render_template('admin/assignment_requests.html', requests=requests, now=datetime.utcnow())
+    return render_template('admin/assignment_requests.html', requests=requests, now=request_now())
 
 
 @admin_bp.route('/assignment-requests/<int:req_id>/approve', methods=['POST'])
@@ -265,13 +318,13 @@ def assignment_requests():
 def approve_assignment_request(req_id):
 
     req = AssignmentRequest.query.get_or_404(req_id)
-    ticket = req.ticket
+    ticket = active_tickets().filter(Ticket.id == req.ticket_id).first_or_404()
 
     # 🔒 HARD RACE-CONDITION GUARD
     if ticket.assigned_to is not None:
         abort(409)
 
-    if ticket.status in ['RESOLVED', 'CLOSED']:
+    if ticket.status in RESOLVED_STATUSES:
         flash("Cannot assign a resolved/closed ticket.", "error")
         return redirect(url_for('admin.assignment_requests'))
 
@@ -287,9 +340,12 @@ def approve_assignment_request(req_id):
         AssignmentRequest.ticket_id == ticket.id,
         AssignmentRequest.id != req.id,
         AssignmentRequest.status == 'PENDING'
-    ).update({'status': 'REJECTED'})
+    ).update({'status': 'REJECTED'}, synchronize_session=False)
 
     db.session.commit()
+    invalidate_pending_assignment_count()
+    invalidate_dashboard_cache()
+    bump_tickets_version(ticket.created_by, req.agent_id)
 
     flash("Ticket assigned and moved to IN PROGRESS.", "success")
     return redirect(url_for('admin.assignment_requests'))
@@ -310,6 +366,8 @@ def reject_assignment_request(req_id):
 
     req.status = 'REJECTED'
     db.session.commit()
+    invalidate_pending_assignment_count()
+    bump_tickets_version(req.agent_id)
 
     flash('Assignment request rejected.', 'info')
     return redirect(url_for('admin.assignment_requests'))
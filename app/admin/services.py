@@ -1,7 +1,20 @@
-from sqlalchemy import func
+from sqlalchemy import func, case, and_, cast, literal, select, union_all, Date, String
+from sqlalchemy.orm import joinedload, load_only
 from datetime import datetime, timedelta
-from app.models import Ticket, User
-from app import db
+from app.models import (
+    Ticket,
+    User,
+    STAFF_ROLES,
+    hours_between,
+    strict_loading,
+    ticket_is_active,
+    active_tickets
+)
+from app import db, cache
+
+# Admin dashboard analytics are cached briefly; mutating admin routes invalidate
+DASHBOARD_CACHE_KEY = 'admin:dashboard'
+DASHBOARD_CACHE_TIMEOUT = 30
 
 
 def get_overview_stats():
@@ -11,105 +24,79 @@ def get_overview_stats():
     Returns:
         dict: Overview statistics
     """
-    # Total tickets
-    total_tickets = Ticket.query.count()
-
-    # Open tickets
-    open_tickets = Ticket.query.filter_by(status='OPEN').count()
-
-    # Closed tickets
-    closed_tickets = Ticket.query.filter_by(status='CLOSED').count()
-
-    # Tickets created today
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    tickets_today = Ticket.query.filter(Ticket.created_at >= today_start).count()
 
-    # Tickets resolved today
-    resolved_today = Ticket.query.filter(
-        Ticket.status == 'RESOLVED',
-        Ticket.resolved_at >= today_start
-    ).count()
-
-    # Average resolution time (last 30 days)
+    # Ticket counts in a single pass
+    counts = db.session.query(
+        func.count(Ticket.id).label('total_tickets'),
+        func.sum(case((Ticket.status == 'OPEN', 1), else_=0)).label('open_tickets'),
+        func.sum(case((Ticket.status == 'CLOSED', 1), else_=0)).label('closed_tickets'),
+        func.sum(case((Ticket.created_at >= today_start, 1), else_=0)).label('tickets_today'),
+        func.sum(case((and_(Ticket.status == 'RESOLVED', Ticket.resolved_at >= today_start), 1),
+                      else_=0)).label('resolved_today')
+    ).filter(ticket_is_active()).one()
+
+    # Average resolution time and SLA compliance rate (last 30 days)
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    resolved_tickets = Ticket.query.filter(
+    resolution_hours = hours_between(Ticket.created_at, Ticket.resolved_at)
+
+    resolved = db.session.query(
+        func.count(Ticket.id).label('resolved_count'),
+        func.avg(resolution_hours).label('avg_resolution_time'),
+        func.sum(case((resolution_hours <= Ticket.sla_target_hours, 1), else_=0)).label('compliant_count')
+    ).filter(
+        ticket_is_active(),
         Ticket.resolved_at.isnot(None),
         Ticket.resolved_at >= thirty_days_ago
-    ).all()
-
-    if resolved_tickets:
-        total_resolution_time = sum([
-            (ticket.resolved_at - ticket.created_at).total_seconds() / 3600
-            for ticket in resolved_tickets
-        ])
-        avg_resolution_time = total_resolution_time / len(resolved_tickets)
-    else:
-        avg_resolution_time = 0
+    ).one()
 
-    # SLA compliance rate
-    if resolved_tickets:
-        compliant_count = sum([
-            1 for ticket in resolved_tickets
-            if (ticket.resolved_at - ticket.created_at).total_seconds() / 3600 <= ticket.get_sla_target()
-        ])
-        sla_compliance_rate = (compliant_count / len(resolved_tickets)) * 100
+    if resolved.resolved_count:
+        avg_resolution_time = resolved.avg_resolution_time
+        sla_compliance_rate = (resolved.compliant_count / resolved.resolved_count) * 100
     else:
+        avg_resolution_time = 0
         sla_compliance_rate = 0
 
     return {
-        'total_tickets': total_tickets,
-        'open_tickets': open_tickets,
-        'closed_tickets': closed_tickets,
-        'tickets_today': tickets_today,
-        'resolved_today': resolved_today,
+        'total_tickets': counts.total_tickets,
+        'open_tickets': counts.open_tickets or 0,
+        'closed_tickets': counts.closed_tickets or 0,
+        'tickets_today': counts.tickets_today or 0,
+        'resolved_today': counts.resolved_today or 0,
         'avg_resolution_time': round(avg_resolution_time, 1),
         'sla_compliance_rate': round(sla_compliance_rate, 1)
     }
 
 
-def get_tickets_by_status():
+def get_ticket_breakdowns():
     """
-    Get ticket counts grouped by status
+    Get ticket counts grouped by status, priority and category in one query
 
     Returns:
-        list: List of dicts with status and count
+        dict: Lists of dicts keyed by dimension, e.g.
+            {'status': [{'status': 'OPEN', 'count': 3}, ...], 'priority': [...], 'category': [...]}
     """
-    results = db.session.query(
-        Ticket.status,
-        func.count(Ticket.id).label('count')
-    ).group_by(Ticket.status).all()
+    dimensions = [
+        ('status', Ticket.status),
+        ('priority', Ticket.priority),
+        ('category', Ticket.category)
+    ]
 
-    return [{'status': row.status, 'count': row.count} for row in results]
+    breakdown = union_all(*[
+        select(
+            literal(name).label('dimension'),
+            cast(column, String).label('value'),
+            func.count(Ticket.id).label('count')
+        ).where(ticket_is_active()).group_by(column)
+        for name, column in dimensions
+    ])
+    breakdown = breakdown.order_by(breakdown.selected_columns.dimension, breakdown.selected_columns.value)
 
+    results = {name: [] for name, _ in dimensions}
+    for row in db.session.execute(breakdown):
+        results[row.dimension].append({row.dimension: row.value, 'count': row.count})
 
-def get_tickets_by_priority():
-    """
-    Get ticket counts grouped by priority
-
-    Returns:
-        list: List of dicts with priority and count
-    """
-    results = db.session.query(
-        Ticket.priority,
-        func.count(Ticket.id).label('count')
-    ).group_by(Ticket.priority).all()
-
-    return [{'priority': row.priority, 'count': row.count} for row in results]
-
-
-def get_tickets_by_category():
-    """
-    Get ticket counts grouped by category
-
-    Returns:
-        list: List of dicts with category and count
-    """
-    results = db.session.query(
-        Ticket.category,
-        func.count(Ticket.id).label('count')
-    ).group_by(Ticket.category).all()
-
-    return [{'category': row.category, 'count': row.count} for row in results]
+    return results
 
 
 def get_agent_performance():
@@ -119,45 +106,51 @@ def get_agent_performance():
     Returns:
         list: List of dicts with agent statistics
     """
-    agents = User.query.filter(User.role.in_(['agent', 'admin'])).all()
+    agents = User.query.filter(User.role.in_(STAFF_ROLES)).all()
 
-    agent_stats = []
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
 
+    # Currently assigned tickets per agent
+    assigned_counts = dict(
+        db.session.query(Ticket.assigned_to, func.count(Ticket.id))
+        .filter(Ticket.assigned_to.isnot(None), ticket_is_active())
+        .group_by(Ticket.assigned_to)
+        .all()
+    )
+
+    # Resolved tickets in last 30 days: count, average resolution time and SLA compliance
+    resolution_hours = hours_between(Ticket.created_at, Ticket.resolved_at)
+
+    resolved_rows = db.session.query(
+        Ticket.assigned_to,
+        func.count(Ticket.id).label('resolved_count'),
+        func.avg(resolution_hours).label('avg_resolution_time'),
+        func.sum(case((resolution_hours <= Ticket.sla_target_hours, 1), else_=0)).label('compliant_count')
+    ).filter(
+        Ticket.assigned_to.isnot(None),
+        Ticket.resolved_at.isnot(None),
+        Ticket.resolved_at >= thirty_days_ago,
+        ticket_is_active()
+    ).group_by(Ticket.assigned_to).all()
+
+    resolved_stats = {row.assigned_to: row for row in resolved_rows}
+
+    agent_stats = []
     for agent in agents:
-        # Currently assigned tickets
-        assigned_count = Ticket.query.filter_by(assigned_to=agent.id).count()
-
-        # Resolved tickets in last 30 days
-        resolved_tickets = Ticket.query.filter(
-            Ticket.assigned_to == agent.id,
-            Ticket.resolved_at.isnot(None),
-            Ticket.resolved_at >= thirty_days_ago
-        ).all()
-
-        resolved_count = len(resolved_tickets)
-
-        # Average resolution time
-        if resolved_tickets:
-            total_resolution_time = sum([
-                (ticket.resolved_at - ticket.created_at).total_seconds() / 3600
-                for ticket in resolved_tickets
-            ])
-            avg_resolution_time = total_resolution_time / len(resolved_tickets)
-
-            # SLA compliance
-            compliant_count = sum([
-                1 for ticket in resolved_tickets
-                if (ticket.resolved_at - ticket.created_at).total_seconds() / 3600 <= ticket.get_sla_target()
-            ])
-            sla_compliance = (compliant_count / len(resolved_tickets)) * 100
+        resolved = resolved_stats.get(agent.id)
+
+        if resolved:
+            resolved_count = resolved.resolved_count
+            avg_resolution_time = resolved.avg_resolution_time or 0
+            sla_compliance = (resolved.compliant_count / resolved_count) * 100
         else:
+            resolved_count = 0
             avg_resolution_time = 0
             sla_compliance = 0
 
         agent_stats.append({
             'name': agent.name,
-            'assigned_count': assigned_count,
+            'assigned_count': assigned_counts.get(agent.id, 0),
             'resolved_count': resolved_count,
             'avg_resolution_time': round(avg_resolution_time, 1),
             'sla_compliance': round(sla_compliance, 1)
@@ -177,36 +170,26 @@ def get_resolution_time_trend(days=30):
         days: Number of days to look back
 
     Returns:
-        list: List of dicts with date and average resolution time
+        list: List of dicts with date (datetime.date) and average resolution time
     """
     start_date = datetime.utcnow() - timedelta(days=days)
 
-    # Get resolved tickets in date range
-    resolved_tickets = Ticket.query.filter(
+    # Group resolved tickets in date range by resolution date
+    resolved_date = func.date(Ticket.resolved_at, type_=Date)
+
+    results = db.session.query(
+        resolved_date.label('date'),
+        func.avg(hours_between(Ticket.created_at, Ticket.resolved_at)).label('avg_hours')
+    ).filter(
+        ticket_is_active(),
         Ticket.resolved_at.isnot(None),
         Ticket.resolved_at >= start_date
-    ).all()
-
-    # Group by date and calculate average
-    date_groups = {}
-    for ticket in resolved_tickets:
-        date_key = ticket.resolved_at.date()
-        resolution_time = (ticket.resolved_at - ticket.created_at).total_seconds() / 3600
-
-        if date_key not in date_groups:
-            date_groups[date_key] = []
-        date_groups[date_key].append(resolution_time)
-
-    # Calculate averages
-    trend_data = []
-    for date_key in sorted(date_groups.keys()):
-        avg_time = sum(date_groups[date_key]) / len(date_groups[date_key])
-        trend_data.append({
-            'date': date_key.isoformat(),
-            'avg_hours': round(avg_time, 1)
-        })
+    ).group_by(resolved_date).order_by(resolved_date).all()
 
-    return trend_data
+    return [
+        {'date': row.date, 'avg_hours': round(row.avg_hours, 1)}
+        for row in results
+    ]
 
 
 def get_recent_activity(limit=20):
@@ -219,7 +202,11 @@ def get_recent_activity(limit=20):
     Returns:
         list: Recent tickets with activity
     """
-    tickets = Ticket.query.order_by(Ticket.created_at.desc()).limit(limit).all()
+    tickets = active_tickets().options(
+        load_only(Ticket.id, Ticket.title, Ticket.status, Ticket.created_at),
+        joinedload(Ticket.creator).load_only(User.name),
+        *strict_loading()
+    ).order_by(Ticket.created_at.desc()).limit(limit).all()
 
     activity = []
     for ticket in tickets:
@@ -232,3 +219,31 @@ def get_recent_activity(limit=20):
         })
 
     return activity
+
+
+def get_dashboard_data():
+    """
+    Get all admin dashboard statistics, cached for DASHBOARD_CACHE_TIMEOUT seconds
+
+    Returns:
+        dict: Overview, chart breakdowns, agent performance, trend and recent activity
+    """
+    data = cache.get(DASHBOARD_CACHE_KEY)
+    if data is None:
+        breakdowns = get_ticket_breakdowns()
+        data = {
+            'overview': get_overview_stats(),
+            'status_data': breakdowns['status'],
+            'priority_data': breakdowns['priority'],
+            'category_data': breakdowns['category'],
+            'agent_performance': get_agent_performance(),
+            'trend_data': get_resolution_time_trend(30),
+            'recent_activity': get_recent_activity(20)
+        }
+        cache.set(DASHBOARD_CACHE_KEY, data, timeout=DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_dashboard_cache():
+    """Drop cached dashboard statistics after admin changes"""
+    cache.delete(DASHBOARD_CACHE_KEY)
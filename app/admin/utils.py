@@ -1,8 +1,38 @@
+import time
+from flask import g
 from flask_login import current_user
-from app.models import AssignmentRequest
+from app.models import AssignmentRequest, ticket_is_active
+
+# Seconds the pending count is shared across requests in this process
+PENDING_COUNT_TTL = 5
+
+_pending_count_cache = {'value': 0, 'expires_at': 0.0}
+
 
 def pending_assignment_count():
-    return AssignmentRequest.query.filter_by(status='PENDING').count()
+    """
+    Get the number of pending assignment requests
+
+    The count is memoized on flask.g for the request and cached in-process
+    for PENDING_COUNT_TTL seconds, so navbar rendering rarely hits the DB.
+
+    Returns:
+        int: Pending assignment request count
+    """
+    if 'pending_assignment_count' not in g:
+        now = time.monotonic()
+        if _pending_count_cache['expires_at'] <= now:
+            _pending_count_cache['value'] = AssignmentRequest.query.join(AssignmentRequest.ticket) \
+                .filter(AssignmentRequest.status == 'PENDING', ticket_is_active()).count()
+            _pending_count_cache['expires_at'] = now + PENDING_COUNT_TTL
+        g.pending_assignment_count = _pending_count_cache['value']
+    return g.pending_assignment_count
+
+
+def invalidate_pending_assignment_count():
+    """Drop the cached pending count after assignment requests change"""
+    _pending_count_cache['expires_at'] = 0.0
+    g.pop('pending_assignment_count', None)
 
 
 def admin_context_processor():
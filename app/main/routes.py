@@ -1,9 +1,25 @@
 from flask import render_template, redirect, url_for
 from flask_login import login_required, current_user
 from app.main import main_bp
-from app.models import Ticket
+from app.models import (
+    Ticket,
+    AssignmentRequest,
+    strict_loading,
+    ticket_list_columns,
+    ticket_is_active,
+    active_tickets,
+    request_now
+)
+from app import db, cache
 from app.auth.decorators import role_required
-from datetime import datetime, timedelta
+from app.services.dashboard_cache import (
+    DASHBOARD_VIEW_CACHE_TIMEOUT,
+    user_dashboard_cache_key,
+    agent_dashboard_cache_key,
+    skip_dashboard_cache
+)
+from datetime import timedelta
+from sqlalchemy import func, and_, or_
 
 
 @main_bp.route('/')
@@ -21,75 +37,124 @@ def index():
 
 @main_bp.route('/dashboard')
 @login_required
+@cache.cached(timeout=DASHBOARD_VIEW_CACHE_TIMEOUT, key_prefix=user_dashboard_cache_key,
+              unless=skip_dashboard_cache)
 def dashboard():
     """User dashboard showing own tickets"""
-    # Get user's tickets
-    tickets = Ticket.query.filter_by(created_by=current_user.id).order_by(Ticket.created_at.desc()).all()
+    # Ticket counts by status
+    status_counts = dict(
+        db.session.query(Ticket.status, func.count(Ticket.id))
+        .filter(Ticket.created_by == current_user.id, ticket_is_active())
+        .group_by(Ticket.status)
+        .all()
+    )
 
     # Calculate statistics
-    total_tickets = len(tickets)
-    open_tickets = len([t for t in tickets if t.status == 'OPEN'])
-    in_progress_tickets = len([t for t in tickets if t.status == 'IN_PROGRESS'])
+    total_tickets = sum(status_counts.values())
+    open_tickets = status_counts.get('OPEN', 0)
+    in_progress_tickets = status_counts.get('IN_PROGRESS', 0)
+
+    # One reference time for the stats and every row's SLA badge
+    now = request_now()
 
     # Resolved tickets in last 30 days
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    resolved_recent = len([t for t in tickets if t.status == 'RESOLVED' and t.resolved_at and t.resolved_at > thirty_days_ago])
+    thirty_days_ago = now - timedelta(days=30)
+    resolved_recent = db.session.query(func.count(Ticket.id)).filter(
+        Ticket.created_by == current_user.id,
+        ticket_is_active(),
+        Ticket.status == 'RESOLVED',
+        Ticket.resolved_at > thirty_days_ago
+    ).scalar()
 
     # Recent tickets (last 10)
-    recent_tickets = tickets[:10]
+    recent_tickets = (
+        active_tickets()
+        .options(ticket_list_columns())
+        .filter_by(created_by=current_user.id)
+        .order_by(Ticket.created_at.desc())
+        .limit(10)
+        .all()
+    )
 
     return render_template('main/user_dashboard.html',
-                           tickets=tickets,
                            recent_tickets=recent_tickets,
                            total_tickets=total_tickets,
                            open_tickets=open_tickets,
                            in_progress_tickets=in_progress_tickets,
-                           resolved_recent=resolved_recent)
+                           resolved_recent=resolved_recent,
+                           now=now)
 
 
 @main_bp.route('/agent/dashboard')
 @role_required('agent')
+@cache.cached(timeout=DASHBOARD_VIEW_CACHE_TIMEOUT, key_prefix=agent_dashboard_cache_key,
+              unless=skip_dashboard_cache)
 def agent_dashboard():
     """Agent dashboard showing assigned and unassigned tickets"""
 
-    # Assigned tickets
-    assigned_tickets = (
-        Ticket.query
-        .filter_by(assigned_to=current_user.id)
+    # Assigned tickets and unassigned OPEN tickets in one round-trip,
+    # partitioned below in a single pass
+    tickets = (
+        active_tickets()
+        .options(ticket_list_columns(), *strict_loading())
+        .filter(or_(
+            Ticket.assigned_to == current_user.id,
+            and_(Ticket.assigned_to.is_(None), Ticket.status == 'OPEN')
+        ))
         .order_by(Ticket.created_at.desc())
         .all()
     )
 
-    # Unassigned + OPEN tickets only
-    unassigned_tickets = (
-        Ticket.query
-        .filter_by(assigned_to=None, status='OPEN')
-        .order_by(Ticket.created_at.desc())
-        .all()
-    )
+    now = request_now()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    assigned_tickets = []
+    unassigned_tickets = []
+    in_progress_count = 0
+    resolved_today = 0
+    overdue_count = 0
+
+    # Stats come from the same rows. Each overdue flag is computed once
+    # against the shared now, and the sort and the template both read it.
+    for ticket in tickets:
+        if ticket.assigned_to is None:
+            unassigned_tickets.append(ticket)
+            continue
+
+        assigned_tickets.append(ticket)
+        ticket.overdue = ticket.is_overdue(now)
+        if ticket.overdue:
+            overdue_count += 1
+        if ticket.status == 'IN_PROGRESS':
+            in_progress_count += 1
+        elif ticket.status == 'RESOLVED' and ticket.resolved_at and ticket.resolved_at >= today_start:
+            resolved_today += 1
 
-    # Stats
     total_assigned = len(assigned_tickets)
-    in_progress_count = len([t for t in assigned_tickets if t.status == 'IN_PROGRESS'])
-
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    resolved_today = len([
-        t for t in assigned_tickets
-        if t.status == 'RESOLVED' and t.resolved_at and t.resolved_at >= today_start
-    ])
-
-    overdue_count = len([t for t in assigned_tickets if t.is_overdue()])
 
     # Sort assigned tickets (overdue first)
     assigned_tickets_sorted = sorted(
         assigned_tickets,
-        key=lambda t: (not t.is_overdue(), t.created_at)
+        key=lambda t: (not t.overdue, t.created_at)
     )
 
     # ---- Assignment request flags (CLEAN, MODEL-DRIVEN) ----
+    # Pending requests by this agent, fetched once instead of per ticket
+    pending_ticket_ids = set()
+    if unassigned_tickets:
+        pending_rows = db.session.query(AssignmentRequest.ticket_id).filter(
+            AssignmentRequest.agent_id == current_user.id,
+            AssignmentRequest.status == 'PENDING',
+            AssignmentRequest.ticket_id.in_([t.id for t in unassigned_tickets])
+        ).all()
+        pending_ticket_ids = {row.ticket_id for row in pending_rows}
+
+    # The query already limits to unassigned OPEN tickets, so eligibility
+    # reduces to the 24h age rule of Ticket.can_request_assignment()
+    request_cutoff = now - timedelta(hours=24)
     for ticket in unassigned_tickets:
-        ticket.can_request = ticket.can_request_assignment()
-        ticket.request_pending = ticket.has_pending_request_from(current_user.id)
+        ticket.can_request = ticket.created_at <= request_cutoff
+        ticket.request_pending = ticket.id in pending_ticket_ids
 
     return render_template(
         'main/agent_dashboard.html',
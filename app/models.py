@@ -1,9 +1,129 @@
 from datetime import datetime, timedelta
+from flask import current_app, g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy import and_, case, event, func, inspect, not_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
+from sqlalchemy.orm import load_only, raiseload
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Float
 from app import db
 
 
+# SLA targets in hours, keyed by ticket priority
+SLA_TARGET_HOURS = {
+    'Critical': 4,
+    'High': 24,
+    'Medium': 48,
+    'Low': 72
+}
+
+# SLA target for priorities missing from SLA_TARGET_HOURS
+DEFAULT_SLA_TARGET_HOURS = 72
+
+# Roles that tickets can be assigned to
+STAFF_ROLES = ('agent', 'admin')
+
+# Statuses whose SLA clock has stopped
+RESOLVED_STATUSES = ('RESOLVED', 'CLOSED')
+
+# Allowed ticket status transitions, built once for O(1) membership checks
+STATUS_TRANSITIONS = {
+    'OPEN': frozenset({'IN_PROGRESS'}),
+    'IN_PROGRESS': frozenset({'OPEN', 'RESOLVED'}),
+    'RESOLVED': frozenset({'IN_PROGRESS', 'CLOSED'}),
+    'CLOSED': frozenset()  # Final state, no transitions allowed
+}
+
+
+class hours_between(FunctionElement):
+    """SQL expression for the fractional hours between two datetimes: hours_between(start, end)"""
+    type = Float()
+    name = 'hours_between'
+    inherit_cache = True
+
+
+@compiles(hours_between)
+def _compile_hours_between(element, compiler, **kw):
+    start, end = [compiler.process(arg, **kw) for arg in element.clauses]
+    return f'(EXTRACT(EPOCH FROM ({end} - {start})) / 3600.0)'
+
+
+@compiles(hours_between, 'sqlite')
+def _compile_hours_between_sqlite(element, compiler, **kw):
+    start, end = [compiler.process(arg, **kw) for arg in element.clauses]
+    return f'((julianday({end}) - julianday({start})) * 24.0)'
+
+
+def strict_loading():
+    """
+    Loader options that make unplanned lazy loads raise instead of querying
+
+    Returns:
+        tuple: raiseload('*') when SQLALCHEMY_RAISELOAD is enabled, empty otherwise
+    """
+    if current_app.config.get('SQLALCHEMY_RAISELOAD'):
+        return (raiseload('*'),)
+    return ()
+
+
+def request_now():
+    """
+    Reference time (naive UTC) shared by everything rendered for one request
+
+    Read once per request and memoized on flask.g, so every SLA badge and
+    overdue check on a page agrees; outside a request it is the current time.
+
+    Returns:
+        datetime: Naive UTC timestamp
+    """
+    if not has_request_context():
+        return datetime.utcnow()
+    if 'request_now' not in g:
+        g.request_now = datetime.utcnow()
+    return g.request_now
+
+
+def ticket_list_columns():
+    """
+    Loader option restricting Ticket rows to the columns list views render
+
+    Leaves out the wide description text; view_ticket keeps the full row.
+
+    Returns:
+        Load: load_only() option for Ticket list and dashboard queries
+    """
+    return load_only(
+        Ticket.id, Ticket.title, Ticket.status, Ticket.priority, Ticket.category,
+        Ticket.created_at, Ticket.resolved_at, Ticket.assigned_to, Ticket.created_by,
+        Ticket.sla_deadline, Ticket.sla_final_overdue, Ticket.sla_final_hours
+    )
+
+
+def ticket_is_active():
+    """
+    Criterion excluding soft-deleted tickets
+
+    Written the same way as the partial index predicates so the planner
+    can match them.
+
+    Returns:
+        ColumnElement: tickets.is_deleted = false
+    """
+    return Ticket.is_deleted == db.false()
+
+
+def active_tickets():
+    """
+    Ticket query excluding soft-deleted tickets
+
+    Returns:
+        Query: Ticket.query filtered by ticket_is_active()
+    """
+    return Ticket.query.filter(ticket_is_active())
+
+
 class User(UserMixin, db.Model):
     """User model for authentication and role management"""
     __tablename__ = 'users'
@@ -15,14 +135,28 @@ class User(UserMixin, db.Model):
     role = db.Column(db.Enum('user', 'agent', 'admin', name='user_roles'), nullable=False, default='user')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Every role lookup is for assignable staff, so index only those rows
+        db.Index(
+            'ix_users_role_staff', 'role',
+            postgresql_where=role.in_(STAFF_ROLES),
+            sqlite_where=role.in_(STAFF_ROLES)
+        ),
+    )
+
     # Relationships
-    created_tickets = db.relationship('Ticket', foreign_keys='Ticket.created_by', backref='creator', lazy='dynamic')
-    assigned_tickets = db.relationship('Ticket', foreign_keys='Ticket.assigned_to', backref='assignee', lazy='dynamic')
+    created_tickets = db.relationship('Ticket', foreign_keys='Ticket.created_by', back_populates='creator', lazy='dynamic')
+    assigned_tickets = db.relationship('Ticket', foreign_keys='Ticket.assigned_to', back_populates='assignee', lazy='dynamic')
     comments = db.relationship('Comment', backref='author', lazy='dynamic')
 
+    @staticmethod
+    def hash_password(password):
+        """Hash a password with the method used for stored user passwords"""
+        return generate_password_hash(password, method='pbkdf2:sha256')
+
     def set_password(self, password):
         """Hash and set user password"""
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        self.password_hash = self.hash_password(password)
 
     def check_password(self, password):
         """Verify password against hash"""
@@ -55,14 +189,48 @@ class Ticket(db.Model):
     priority = db.Column(db.Enum('Low', 'Medium', 'High', 'Critical', name='ticket_priorities'), nullable=False)
     status = db.Column(db.Enum('OPEN', 'IN_PROGRESS', 'RESOLVED', 'CLOSED', name='ticket_statuses'),
                        nullable=False, default='OPEN')
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    resolved_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    resolved_at = db.Column(db.DateTime, nullable=True, index=True)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     assigned_to = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    # created_at + SLA target, stored on write (see _set_sla_deadline)
+    sla_deadline = db.Column(db.DateTime, nullable=False)
+    # Final SLA outcome, frozen when the ticket is closed (see closed_sla_values)
+    sla_final_overdue = db.Column(db.Boolean, nullable=True)
+    sla_final_hours = db.Column(db.Float, nullable=True)
+    # Soft delete: set by the owner, hidden from every list and dashboard
+    is_deleted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     # Relationships
+    creator = db.relationship('User', foreign_keys=[created_by], back_populates='created_tickets')
+    assignee = db.relationship('User', foreign_keys=[assigned_to], back_populates='assigned_tickets')
     comments = db.relationship('Comment', backref='ticket', lazy='dynamic', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Per-agent workload counts and 30-day resolution stats
+        db.Index('ix_tickets_assigned_to_resolved_at', 'assigned_to', 'resolved_at'),
+        # List queries filter by owner, assignee or status and order by
+        # (created_at DESC, id DESC); each index matches that order (read backwards).
+        # Owner, status and unassigned lookups always go through active_tickets(),
+        # so those indexes leave out soft-deleted rows (deleted tickets are never assigned).
+        db.Index('ix_tickets_created_by_created_at', 'created_by', 'created_at', 'id',
+                 postgresql_where=is_deleted == db.false(), sqlite_where=is_deleted == db.false()),
+        db.Index('ix_tickets_assigned_to_created_at', 'assigned_to', 'created_at', 'id'),
+        db.Index('ix_tickets_status_created', 'status', 'created_at', 'id',
+                 postgresql_where=is_deleted == db.false(), sqlite_where=is_deleted == db.false()),
+        # The unassigned pool: agent list branch and the admin assign queue
+        db.Index('ix_tickets_unassigned', 'created_at', 'id',
+                 postgresql_where=and_(assigned_to.is_(None), is_deleted == db.false()),
+                 sqlite_where=and_(assigned_to.is_(None), is_deleted == db.false())),
+        # The unassigned OPEN queue on agent dashboards (also serves status-only lookups)
+        db.Index('ix_tickets_status_assigned_created', 'status', 'assigned_to', 'created_at',
+                 postgresql_where=is_deleted == db.false(), sqlite_where=is_deleted == db.false()),
+        # Overdue lookups: a range scan over tickets whose SLA clock is still running
+        db.Index('ix_tickets_sla_deadline_open', 'sla_deadline',
+                 postgresql_where=and_(not_(status.in_(RESOLVED_STATUSES)), is_deleted == db.false()),
+                 sqlite_where=and_(not_(status.in_(RESOLVED_STATUSES)), is_deleted == db.false())),
+    )
+
     def get_resolution_time(self):
         """
         Calculate time taken to resolve ticket
@@ -74,33 +242,66 @@ class Ticket(db.Model):
             return self.resolved_at - self.created_at
         return None
 
-    def get_sla_target(self):
+    # ---- SLA hybrids: usable on instances and as SQL expressions ----
+
+    @hybrid_property
+    def sla_target_hours(self):
+        """SLA target hours for this ticket's priority"""
+        return SLA_TARGET_HOURS.get(self.priority, DEFAULT_SLA_TARGET_HOURS)
+
+    @sla_target_hours.expression
+    def sla_target_hours(cls):
+        return case(SLA_TARGET_HOURS, value=cls.priority, else_=DEFAULT_SLA_TARGET_HOURS)
+
+    @hybrid_method
+    def sla_elapsed_hours(self, now=None):
         """
-        Get SLA target hours based on priority
+        Hours counted against the SLA
+
+        Args:
+            now: Reference time (naive UTC) for tickets that are still open
 
         Returns:
-            int: Target hours for this priority level
+            float: Creation to resolution for resolved/closed tickets, creation to now otherwise
         """
-        sla_targets = {
-            'Critical': 4,
-            'High': 24,
-            'Medium': 48,
-            'Low': 72
-        }
-        return sla_targets.get(self.priority, 72)
-
-    def is_overdue(self):
+        if self.status in RESOLVED_STATUSES and self.resolved_at:
+            return (self.resolved_at - self.created_at).total_seconds() / 3600
+        return ((now or request_now()) - self.created_at).total_seconds() / 3600
+
+    @sla_elapsed_hours.expression
+    def sla_elapsed_hours(cls, now=None):
+        return case(
+            (and_(cls.status.in_(RESOLVED_STATUSES), cls.resolved_at.isnot(None)),
+             hours_between(cls.created_at, cls.resolved_at)),
+            else_=hours_between(cls.created_at, now or request_now())
+        )
+
+    @hybrid_method
+    def is_overdue(self, now=None):
         """
         Check if ticket has breached SLA
 
+        Args:
+            now: Reference time (naive UTC); callers checking many tickets pass one value
+
         Returns:
             bool: True if ticket is overdue, False otherwise
         """
-        if self.status in ['RESOLVED', 'CLOSED']:
+        if self.status in RESOLVED_STATUSES:
             return False
 
-        elapsed_hours = (datetime.utcnow() - self.created_at).total_seconds() / 3600
-        return elapsed_hours > self.get_sla_target()
+        # Derive the deadline for tickets not flushed yet (set by the
+        # before_insert hook), as calculate_sla_status does
+        deadline = self.sla_deadline or self.created_at + timedelta(hours=self.sla_target_hours)
+        return (now or request_now()) > deadline
+
+    @is_overdue.expression
+    def is_overdue(cls, now=None):
+        # Compares the stored deadline, so it can use ix_tickets_sla_deadline_open
+        return and_(
+            not_(cls.status.in_(RESOLVED_STATUSES)),
+            cls.sla_deadline < (now or request_now())
+        )
 
     def can_transition_to(self, new_status):
         """
@@ -112,30 +313,29 @@ class Ticket(db.Model):
         Returns:
             bool: True if transition is valid, False otherwise
         """
-        valid_transitions = {
-            'OPEN': ['IN_PROGRESS'],
-            'IN_PROGRESS': ['OPEN', 'RESOLVED'],
-            'RESOLVED': ['IN_PROGRESS', 'CLOSED'],
-            'CLOSED': []  # Final state, no transitions allowed
-        }
-
-        allowed_statuses = valid_transitions.get(self.status, [])
-        return new_status in allowed_statuses
+        return new_status in STATUS_TRANSITIONS.get(self.status, ())
 
-    '''def can_request_assignment(self):
+    def viewable_by(self, user):
         """
-        Agent can request assignment only if:
-        - Ticket is unassigned
-        - Ticket is OPEN
-        - Ticket is older than 24 hours
+        Check if user may open this ticket's detail page
+
+        Uses only loaded columns, so it never queries. Agents see only
+        tickets assigned to them here, which is stricter than
+        can_user_view_ticket (that one also admits unassigned tickets).
+
+        Args:
+            user: User model instance
+
+        Returns:
+            bool: True if user can view the ticket detail
         """
-        if self.assigned_to is not None:
-            return False
-    
-        if self.status != 'OPEN':
-            return False
-    
-        return datetime.utcnow() >= self.created_at + timedelta(hours=24)'''
+        if user.is_admin():
+            return True
+
+        if user.is_agent():
+            return self.assigned_to == user.id
+
+        return self.created_by == user.id
 
     def hours_since_creation(self):
         return (datetime.utcnow() - self.created_at).total_seconds() / 3600
@@ -148,29 +348,58 @@ class Ticket(db.Model):
             self.hours_since_creation() >= 24
         )
 
-    
-    
-    def has_pending_request_from(self, agent_id):
-        return any(
-            r.agent_id == agent_id and r.status == 'PENDING'
-            for r in self.assignment_requests
-        )
-
 
     def __repr__(self):
         return f'<Ticket #{self.id}: {self.title} ({self.status})>'
 
 
+def closed_sla_values():
+    """
+    UPDATE values that freeze a ticket's SLA outcome as it is closed
+
+    Closing only happens from RESOLVED and CLOSED tickets never change, so
+    the outcome is computed once, in the closing statement itself.
+
+    Returns:
+        dict: SQL expressions for sla_final_overdue and sla_final_hours
+    """
+    return {
+        'sla_final_overdue': Ticket.resolved_at > Ticket.sla_deadline,
+        # Whole seconds, so float error in the SQL date math can't tip it below a boundary
+        'sla_final_hours': func.round(hours_between(Ticket.created_at, Ticket.resolved_at) * 3600) / 3600.0,
+    }
+
+
+@event.listens_for(Ticket, 'before_insert')
+@event.listens_for(Ticket, 'before_update')
+def _set_sla_deadline(mapper, connection, ticket):
+    """Keep sla_deadline in step with created_at and priority on every ORM flush"""
+    state = inspect(ticket)
+    if state.persistent and not (state.attrs.priority.history.has_changes()
+                                 or state.attrs.created_at.history.has_changes()):
+        return
+
+    # The column default is applied after this hook, so fill it in here
+    if ticket.created_at is None:
+        ticket.created_at = datetime.utcnow()
+    ticket.sla_deadline = ticket.created_at + timedelta(hours=ticket.sla_target_hours)
+
+
 class Comment(db.Model):
     """Comment model for ticket discussions"""
     __tablename__ = 'comments'
 
     id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False, index=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
 
+    __table_args__ = (
+        # A ticket's comment thread in creation order (also serves ticket_id lookups)
+        db.Index('ix_comments_ticket_id_created_at', 'ticket_id', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<Comment #{self.id} on Ticket #{self.ticket_id}>'
 
@@ -202,6 +431,16 @@ class AssignmentRequest(db.Model):
             'agent_id',
             name='uq_ticket_agent_request'
         ),
+        # Pending-request lookups per agent and per ticket
+        db.Index('ix_assignment_requests_agent_status', 'agent_id', 'status'),
+        db.Index('ix_assignment_requests_ticket_status', 'ticket_id', 'status'),
+        # At most one PENDING request per ticket, enforced by the database
+        db.Index(
+            'uq_ticket_pending_request', 'ticket_id',
+            unique=True,
+            postgresql_where=db.text("status = 'PENDING'"),
+            sqlite_where=db.text("status = 'PENDING'")
+        ),
     )
 
 
@@ -0,0 +1,82 @@
+import time
+from flask import session
+from flask_login import current_user
+from app import cache
+
+# Seconds a rendered user/agent dashboard is reused between ticket changes
+DASHBOARD_VIEW_CACHE_TIMEOUT = 30
+
+# Version scope shared by every agent dashboard (the unassigned OPEN pool)
+UNASSIGNED_POOL_SCOPE = 'pool'
+
+
+def _version_key(scope):
+    return f'tickets_version:{scope}'
+
+
+def tickets_version(scope):
+    """
+    Get the current tickets version token for a user or the unassigned pool
+
+    Args:
+        scope: User id, or UNASSIGNED_POOL_SCOPE
+
+    Returns:
+        int: Version token, 0 until the scope is first bumped
+    """
+    return cache.get(_version_key(scope)) or 0
+
+
+def bump_tickets_version(*user_ids):
+    """
+    Invalidate cached dashboards after a ticket change
+
+    Every affected user's version moves, and so does the unassigned pool
+    version, since any ticket change can add to or remove from the pool
+    that agent dashboards list.
+
+    Args:
+        *user_ids: Creator, assignees and requesting agents touched by the change
+    """
+    # A fresh token instead of an increment, so an evicted or expired
+    # counter can never fall back to a value an old cached page used
+    token = time.time_ns()
+    for scope in {*user_ids, UNASSIGNED_POOL_SCOPE}:
+        if scope is not None:
+            cache.set(_version_key(scope), token, timeout=0)
+
+
+def user_dashboard_cache_key():
+    """
+    Cache key for the current user's dashboard
+
+    Returns:
+        str: Key derived from the user id and that user's tickets version only
+    """
+    return f'view:dashboard:{current_user.id}:{tickets_version(current_user.id)}'
+
+
+def agent_dashboard_cache_key():
+    """
+    Cache key for the current agent's dashboard
+
+    Returns:
+        str: Key derived from the agent id and the agent and pool versions
+    """
+    return (
+        f'view:agent_dashboard:{current_user.id}:'
+        f'{tickets_version(current_user.id)}:{tickets_version(UNASSIGNED_POOL_SCOPE)}'
+    )
+
+
+def skip_dashboard_cache():
+    """
+    Bypass the view cache while flash messages are pending
+
+    Flashes are rendered into the page, so caching such a response would
+    replay them, and serving a cached page would leave them undisplayed.
+
+    Returns:
+        bool: True when the dashboard must be rendered fresh
+    """
+    return bool(session.get('_flashes'))
@@ -1,16 +1,29 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
+from functools import lru_cache
+from app.models import SLA_TARGET_HOURS, DEFAULT_SLA_TARGET_HOURS, request_now
 
-# SLA rules in hours
-SLA_HOURS = {
-    "CRITICAL": 4,
-    "HIGH": 24,
-    "MEDIUM": 48,
-    "LOW": 72
-}
 
+def get_sla_deadline(created_at, priority):
+    """
+    Returns the SLA deadline for a ticket created at `created_at` with `priority`
+    """
+    sla_hours = SLA_TARGET_HOURS.get(priority, DEFAULT_SLA_TARGET_HOURS)
+    return created_at + timedelta(hours=sla_hours)
+
+
+@lru_cache(maxsize=4096)
+def _resolved_is_overdue(created_at, priority, resolved_at):
+    """
+    Whether a resolved ticket breached its SLA; fixed for given inputs, so memoized.
+    Only the immutable bool is cached; callers get a fresh dict every time.
+    """
+    return resolved_at > get_sla_deadline(created_at, priority)
 
-def calculate_sla_status(ticket):
+
+def calculate_sla_status(ticket, now=None):
     """
+    now: reference time (naive UTC); pass one value when rendering many tickets
+
     Returns:
     {
         status: "ok" | "breached",
@@ -22,27 +35,19 @@ def calculate_sla_status(ticket):
     if not ticket.created_at:
         return None
 
-    priority = ticket.priority.upper()
-    sla_hours = SLA_HOURS.get(priority, 72)
-
-    deadline = ticket.created_at + timedelta(hours=sla_hours)
-
-    now = datetime.utcnow()
-
     # If already resolved
     if ticket.resolved_at:
-        if ticket.resolved_at <= deadline:
-            return {
-                "status": "ok",
-                "remaining": timedelta(seconds=0),
-                "overdue": False
-            }
-        else:
-            return {
-                "status": "breached",
-                "remaining": timedelta(seconds=0),
-                "overdue": True
-            }
+        overdue = _resolved_is_overdue(ticket.created_at, ticket.priority, ticket.resolved_at)
+        return {
+            "status": "breached" if overdue else "ok",
+            "remaining": timedelta(seconds=0),
+            "overdue": overdue
+        }
+
+    # Tickets store their deadline on write; derive it for bare objects
+    deadline = getattr(ticket, 'sla_deadline', None) or get_sla_deadline(ticket.created_at, ticket.priority)
+
+    now = now or request_now()
 
     # Not resolved yet
     if now <= deadline:
@@ -0,0 +1,28 @@
+from app.models import User, STAFF_ROLES
+from app import cache
+
+# Staff shown in assignment dropdowns; changes only when users are edited
+ASSIGNABLE_AGENTS_CACHE_KEY = 'assignable_agents'
+ASSIGNABLE_AGENTS_CACHE_TIMEOUT = 300
+
+
+def get_assignable_agents():
+    """
+    Get agents and admins that tickets can be assigned to
+
+    Returns:
+        list: List of dicts with agent id and name
+    """
+    agents = cache.get(ASSIGNABLE_AGENTS_CACHE_KEY)
+    if agents is None:
+        rows = User.query.with_entities(User.id, User.name) \
+            .filter(User.role.in_(STAFF_ROLES)) \
+            .all()
+        agents = [{'id': row.id, 'name': row.name} for row in rows]
+        cache.set(ASSIGNABLE_AGENTS_CACHE_KEY, agents, timeout=ASSIGNABLE_AGENTS_CACHE_TIMEOUT)
+    return agents
+
+
+def invalidate_assignable_agents():
+    """Drop the cached agents list after users are created, edited or deleted"""
+    cache.delete(ASSIGNABLE_AGENTS_CACHE_KEY)
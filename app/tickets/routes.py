@@ -1,18 +1,41 @@
 from flask import render_template, redirect, url_for, flash, request, abort
 from flask_login import login_required, current_user
 from app.tickets import tickets_bp
-from app.models import Ticket, Comment, User
+from app.models import (
+    Ticket,
+    Comment,
+    User,
+    RESOLVED_STATUSES,
+    strict_loading,
+    ticket_list_columns,
+    ticket_is_active,
+    active_tickets,
+    closed_sla_values
+)
 from app import db
+from sqlalchemy import exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload, load_only
 from app.tickets.services import (
     calculate_sla_status,
+    calculate_sla_statuses,
+    encode_ticket_cursor,
+    decode_ticket_cursor,
     update_ticket_status,
+    guarded_ticket_update,
     can_user_view_ticket,
     get_user_tickets
 )
 from datetime import datetime
 from datetime import timedelta
 from app.models import AssignmentRequest
+from app.admin.utils import invalidate_pending_assignment_count
+from app.admin.services import invalidate_dashboard_cache
+from app.services.user_service import get_assignable_agents
+from app.services.dashboard_cache import bump_tickets_version
 
+# Rows per page on the ticket list
+TICKETS_PER_PAGE = 25
 
 
 @tickets_bp.route('/')
@@ -25,25 +48,46 @@ def list_tickets():
         'priority': request.args.get('priority'),
         'category': request.args.get('category'),
         'assigned_to': request.args.get('assigned_to'),
-        'created_by': request.args.get('created_by')
+        'created_by': request.args.get('created_by'),
+        'overdue': request.args.get('overdue')
     }
 
     # Remove None values
     filters = {k: v for k, v in filters.items() if v}
 
-    # Get tickets based on user role and filters
-    tickets_query = get_user_tickets(current_user, filters)
-    tickets = tickets_query.all()
+    # Keyset cursors are kept out of filters so page links don't carry them
+    after = decode_ticket_cursor(request.args.get('after'))
+    before = None if after else decode_ticket_cursor(request.args.get('before'))
+
+    # Get tickets based on user role and filters; one extra row tells
+    # whether another page exists without a COUNT query
+    tickets_query = get_user_tickets(current_user, dict(filters, after=after, before=before))
+    tickets = tickets_query.options(
+        ticket_list_columns(), selectinload(Ticket.assignee), *strict_loading()
+    ).limit(TICKETS_PER_PAGE + 1).all()
+
+    has_more = len(tickets) > TICKETS_PER_PAGE
+    tickets = tickets[:TICKETS_PER_PAGE]
+    if before:
+        tickets.reverse()
+
+    # Paging backwards, there is always a newer-side page to return to
+    has_next = has_more if not before else True
+    has_prev = bool(after) or (bool(before) and has_more)
+    next_cursor = encode_ticket_cursor(tickets[-1]) if has_next and tickets else None
+    prev_cursor = encode_ticket_cursor(tickets[0]) if has_prev and tickets else None
 
     # Calculate SLA status for each ticket
-    for ticket in tickets:
-        ticket.sla_status = calculate_sla_status(ticket)
+    for ticket, sla_status in zip(tickets, calculate_sla_statuses(tickets)):
+        ticket.sla_status = sla_status
 
     # Get filter options
-    agents = User.query.filter(User.role.in_(['agent', 'admin'])).all()
+    agents = get_assignable_agents()
 
     return render_template('tickets/list.html',
                            tickets=tickets,
+                           next_cursor=next_cursor,
+                           prev_cursor=prev_cursor,
                            agents=agents,
                            filters=filters)
 
@@ -97,6 +141,7 @@ def create_ticket():
 
         db.session.add(ticket)
         db.session.commit()
+        bump_tickets_version(ticket.created_by)
 
         flash(f'Ticket #{ticket.id} created successfully', 'success')
         return redirect(url_for('tickets.view_ticket', id=ticket.id))
@@ -108,14 +153,15 @@ def create_ticket():
 @login_required
 def view_ticket(id):
     """View ticket detail"""
-    ticket = Ticket.query.get_or_404(id)
-    # 🔒 AGENT ACCESS CONTROL
-    if current_user.is_agent():
-        if ticket.assigned_to != current_user.id:
-            abort(403)
-
-    # Check permission
-    if not can_user_view_ticket(ticket, current_user):
+    # Creator and assignee names are rendered, so load them in the same query
+    ticket = active_tickets().options(
+        joinedload(Ticket.creator).load_only(User.id, User.name),
+        joinedload(Ticket.assignee).load_only(User.id, User.name),
+        *strict_loading()
+    ).filter(Ticket.id == id).first_or_404()
+
+    # 🔒 Single permission check (agents: assigned tickets only)
+    if not ticket.viewable_by(current_user):
         flash('Access denied. You do not have permission to view this ticket.', 'error')
         abort(403)
 
@@ -123,12 +169,15 @@ def view_ticket(id):
     ticket.sla_status = calculate_sla_status(ticket)
 
     # Get comments with authors
-    comments = Comment.query.filter_by(ticket_id=id).order_by(Comment.created_at.asc()).all()
+    comments = Comment.query.options(
+        joinedload(Comment.author).load_only(User.id, User.name, User.role),
+        *strict_loading()
+    ).filter_by(ticket_id=id).order_by(Comment.created_at.asc()).all()
 
     # Get available agents for assignment (admin/agent only)
     agents = None
     if current_user.is_admin() or current_user.is_agent():
-        agents = User.query.filter(User.role.in_(['agent', 'admin'])).all()
+        agents = get_assignable_agents()
 
     return render_template('tickets/detail.html',
                            ticket=ticket,
@@ -140,7 +189,7 @@ def view_ticket(id):
 @login_required
 def add_comment(id):
     """Add comment to ticket"""
-    ticket = Ticket.query.get_or_404(id)
+    ticket = active_tickets().filter(Ticket.id == id).first_or_404()
   
 	# 🔒 HARD LOCK: no comments on CLOSED tickets
     if ticket.status == 'CLOSED':
@@ -182,7 +231,12 @@ def add_comment(id):
 @login_required
 def update_status(id):
     """Update ticket status with strict RBAC"""
-    ticket = Ticket.query.get_or_404(id)
+    # RBAC needs three columns; the service locks and loads the row itself
+    ticket = db.session.execute(
+        select(Ticket.created_by, Ticket.assigned_to, Ticket.status).where(Ticket.id == id, ticket_is_active())
+    ).one_or_none()
+    if ticket is None:
+        abort(404)
 
     new_status = request.form.get('status')
 
@@ -199,7 +253,7 @@ def update_status(id):
 
     # ADMIN: can ONLY reopen resolved/closed tickets
     elif current_user.is_admin():
-        if new_status != 'IN_PROGRESS' or ticket.status not in ['RESOLVED', 'CLOSED']:
+        if new_status != 'IN_PROGRESS' or ticket.status not in RESOLVED_STATUSES:
             abort(403)
 
     # USER: never allowed
@@ -208,8 +262,10 @@ def update_status(id):
 
     # =============================================
 
+    affected_users = (ticket.created_by, ticket.assigned_to)
     try:
         update_ticket_status(id, new_status, current_user)
+        bump_tickets_version(*affected_users)
         flash(f'Ticket status updated to {new_status}', 'success')
     except Exception as e:
         flash(str(e), 'error')
@@ -228,16 +284,21 @@ def assign_ticket(id):
         flash('Access denied. Only admins can assign tickets.', 'error')
         abort(403)
 
-    ticket = Ticket.query.get_or_404(id)
+    ticket = active_tickets().filter(Ticket.id == id).first_or_404()
 
     agent_id = request.form.get('agent_id')
     if ticket.status == 'CLOSED':
         abort(409)  # conflict
 
-    # Handle unassignment
+    previous_assignee = ticket.assigned_to
+
+    # Handle unassignment (guarded so a ticket closed meanwhile is left alone)
     if not agent_id or agent_id == '':
-        ticket.assigned_to = None
+        updated = guarded_ticket_update(id, [Ticket.status != 'CLOSED', ticket_is_active()], {'assigned_to': None})
+        if updated is None:
+            abort(409)
         db.session.commit()
+        bump_tickets_version(updated.created_by, previous_assignee)
         flash('Ticket unassigned', 'success')
         return redirect(url_for('tickets.view_ticket', id=id))
 
@@ -248,8 +309,11 @@ def assign_ticket(id):
         return redirect(url_for('tickets.view_ticket', id=id))
 
     # Assign ticket
-    ticket.assigned_to = agent.id
+    updated = guarded_ticket_update(id, [Ticket.status != 'CLOSED', ticket_is_active()], {'assigned_to': agent.id})
+    if updated is None:
+        abort(409)
     db.session.commit()
+    bump_tickets_version(updated.created_by, previous_assignee, agent.id)
 
     flash(f'Ticket assigned to {agent.name}', 'success')
     return redirect(url_for('tickets.view_ticket', id=id))
@@ -264,43 +328,45 @@ def request_assignment(id):
     if not current_user.is_agent():
         abort(403)
 
-    ticket = Ticket.query.get_or_404(id)
+    # Only the columns the eligibility check needs
+    ticket = active_tickets().options(
+        load_only(Ticket.assigned_to, Ticket.status, Ticket.created_at)
+    ).filter(Ticket.id == id).first_or_404()
 
     # ✅ Single source of truth (24h + unassigned)
     if not ticket.can_request_assignment():
         flash("This ticket is not eligible for assignment request yet.", "error")
         return redirect(url_for('main.agent_dashboard'))
 
-    # 🚫 Prevent parallel requests by multiple agents
-    existing_pending = AssignmentRequest.query.filter_by(
-        ticket_id=id,
-        status='PENDING'
-    ).first()
-
-    if existing_pending:
-        flash("Another agent has already requested this ticket.", "info")
-        return redirect(url_for('main.agent_dashboard'))
-
-    # 🚫 Prevent same agent duplicate pending request
-    existing_agent_req = AssignmentRequest.query.filter_by(
-        ticket_id=id,
-        agent_id=current_user.id,
-        status='PENDING'
-    ).first()
-
-    if existing_agent_req:
-        flash("You already have a pending request for this ticket.", "info")
-        return redirect(url_for('main.agent_dashboard'))
-
-    # ✅ Create request
+    # ✅ Create request; the unique constraints reject duplicates and
+    # parallel requests atomically, so no preflight lookups are needed
+    agent_id = current_user.id
     req = AssignmentRequest(
         ticket_id=id,
-        agent_id=current_user.id,
+        agent_id=agent_id,
         status='PENDING'
     )
 
     db.session.add(req)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+        # 🚫 Same agent requested before (uq_ticket_agent_request), otherwise
+        # another agent holds the pending slot (uq_ticket_pending_request)
+        own_request = db.session.query(exists().where(
+            AssignmentRequest.ticket_id == id,
+            AssignmentRequest.agent_id == agent_id
+        )).scalar()
+        if own_request:
+            flash("You have already requested this ticket.", "info")
+        else:
+            flash("Another agent has already requested this ticket.", "info")
+        return redirect(url_for('main.agent_dashboard'))
+
+    invalidate_pending_assignment_count()
+    bump_tickets_version(agent_id)
 
     flash("Assignment request sent to admin.", "success")
     return redirect(url_for('main.agent_dashboard'))
@@ -308,22 +374,26 @@ def request_assignment(id):
 @tickets_bp.route('/<int:id>/close', methods=['POST'])
 @login_required
 def close_ticket(id):
-    ticket = Ticket.query.get_or_404(id)
+    # Close in one guarded UPDATE: only RESOLVED tickets, only by owner or admin
+    criteria = [Ticket.status == 'RESOLVED', ticket_is_active()]
+    if not current_user.is_admin():
+        criteria.append(Ticket.created_by == current_user.id)
 
-    # Only RESOLVED tickets can be closed
-    if ticket.status != 'RESOLVED':
-        flash("Only resolved tickets can be closed.", "error")
-        return redirect(url_for('tickets.view_ticket', id=id))
+    updated = guarded_ticket_update(id, criteria, {'status': 'CLOSED', **closed_sla_values()})
+    if updated is None:
+        # Nothing matched; load the ticket only to report why
+        ticket = active_tickets().filter(Ticket.id == id).first_or_404()
 
-    # Permission: ticket owner OR admin
-    is_owner = ticket.created_by == current_user.id
-    is_admin = current_user.is_admin()
+        # Only RESOLVED tickets can be closed
+        if ticket.status != 'RESOLVED':
+            flash("Only resolved tickets can be closed.", "error")
+            return redirect(url_for('tickets.view_ticket', id=id))
 
-    if not (is_owner or is_admin):
+        # Permission: ticket owner OR admin
         abort(403)
 
-    ticket.status = 'CLOSED'
     db.session.commit()
+    bump_tickets_version(updated.created_by, updated.assigned_to)
 
     flash("Ticket closed successfully.", "success")
     return redirect(url_for('tickets.view_ticket', id=id))
@@ -331,23 +401,26 @@ def close_ticket(id):
 @tickets_bp.route('/<int:id>/reopen', methods=['POST'])
 @login_required
 def reopen_ticket(id):
-    ticket = Ticket.query.get_or_404(id)
+    # Reopen in one guarded UPDATE: only RESOLVED tickets, only by owner or admin
+    criteria = [Ticket.status == 'RESOLVED', ticket_is_active()]
+    if not current_user.is_admin():
+        criteria.append(Ticket.created_by == current_user.id)
 
-    # Only RESOLVED tickets can be reopened
-    if ticket.status != 'RESOLVED':
-        flash("Only resolved tickets can be reopened.", "error")
-        return redirect(url_for('tickets.view_ticket', id=id))
+    updated = guarded_ticket_update(id, criteria, {'status': 'IN_PROGRESS', 'resolved_at': None})
+    if updated is None:
+        # Nothing matched; load the ticket only to report why
+        ticket = active_tickets().filter(Ticket.id == id).first_or_404()
 
-    # Permission: ticket owner OR admin
-    is_owner = ticket.created_by == current_user.id
-    is_admin = current_user.is_admin()
+        # Only RESOLVED tickets can be reopened
+        if ticket.status != 'RESOLVED':
+            flash("Only resolved tickets can be reopened.", "error")
+            return redirect(url_for('tickets.view_ticket', id=id))
 
-    if not (is_owner or is_admin):
+        # Permission: ticket owner OR admin
         abort(403)
 
-    ticket.status = 'IN_PROGRESS'
-    ticket.resolved_at = None
     db.session.commit()
+    bump_tickets_version(updated.created_by, updated.assigned_to)
 
     flash("Ticket reopened and moved back to In Progress.", "success")
     return redirect(url_for('tickets.view_ticket', id=id))
@@ -356,7 +429,7 @@ def reopen_ticket(id):
 @tickets_bp.route('/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_ticket(id):
-    ticket = Ticket.query.get_or_404(id)
+    ticket = active_tickets().filter(Ticket.id == id).first_or_404()
 
     if ticket.created_by != current_user.id:
         abort(403)
@@ -371,6 +444,7 @@ def edit_ticket(id):
         ticket.priority = request.form['priority']
         ticket.category = request.form['category']
         db.session.commit()
+        bump_tickets_version(ticket.created_by)
 
         flash("Ticket updated successfully.", "success")
         return redirect(url_for('tickets.view_ticket', id=id))
@@ -380,7 +454,7 @@ def edit_ticket(id):
 @tickets_bp.route('/<int:id>/delete', methods=['POST'])
 @login_required
 def delete_ticket(id):
-    ticket = Ticket.query.get_or_404(id)
+    ticket = active_tickets().filter(Ticket.id == id).first_or_404()
 
     if ticket.created_by != current_user.id:
         abort(403)
@@ -390,7 +464,21 @@ def delete_ticket(id):
         return redirect(url_for('tickets.view_ticket', id=id))
 
     ticket.is_deleted = True
+
+    # A deleted ticket can no longer be assigned, so drop its pending
+    # requests; the requesting agents' dashboards change too
+    requesting_agents = db.session.execute(
+        update(AssignmentRequest)
+        .where(AssignmentRequest.ticket_id == id, AssignmentRequest.status == 'PENDING')
+        .values(status='REJECTED')
+        .returning(AssignmentRequest.agent_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
     db.session.commit()
+    invalidate_pending_assignment_count()
+    bump_tickets_version(ticket.created_by, *requesting_agents)
+    invalidate_dashboard_cache()
 
     flash("Ticket removed from your view.", "success")
     return redirect(url_for('main.dashboard'))
@@ -1,17 +1,58 @@
-from datetime import datetime
-from app.models import Ticket
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from flask import abort
+from sqlalchemy import select, tuple_, update
+from sqlalchemy.orm import load_only
+from app.models import (
+    Ticket,
+    RESOLVED_STATUSES,
+    SLA_TARGET_HOURS,
+    DEFAULT_SLA_TARGET_HOURS,
+    STATUS_TRANSITIONS,
+    active_tickets,
+    closed_sla_values,
+    strict_loading,
+    ticket_is_active,
+    request_now,
+)
 from app import db
 
 
-def calculate_sla_status(ticket):
+@dataclass(slots=True, frozen=True)
+class SlaStatus:
+    """SLA status of one ticket, as rendered by the ticket list and detail pages"""
+    target_hours: float
+    elapsed_hours: float
+    remaining_hours: float
+    is_overdue: bool
+    status_class: str
+    display_text: str
+
+
+def get_sla_target(priority):
+    """
+    Get SLA target hours for a priority
+
+    Args:
+        priority: Ticket priority
+
+    Returns:
+        int: Target hours for the priority
+    """
+    return SLA_TARGET_HOURS.get(priority, DEFAULT_SLA_TARGET_HOURS)
+
+
+def calculate_sla_status(ticket, now=None):
     """
     Calculate SLA status for a ticket
 
     Args:
         ticket: Ticket model instance
+        now: Reference time (naive UTC), defaults to request_now()
 
     Returns:
-        dict: SLA status information with keys:
+        SlaStatus: SLA status information with fields:
             - target_hours: SLA target based on priority
             - elapsed_hours: Hours since ticket creation
             - remaining_hours: Hours until SLA breach (negative if overdue)
@@ -19,29 +60,57 @@ def calculate_sla_status(ticket):
             - status_class: CSS class for styling
             - display_text: Human-readable status text
     """
-    target_hours = ticket.get_sla_target()
+    # Memoized on the instance for repeat calls with the same reference time
+    # (request_now() is fixed for a request); the key includes every input
+    # so a status change recomputes
+    now = now or request_now()
+    cache_key = (now, ticket.status, ticket.priority, ticket.sla_deadline, ticket.created_at, ticket.resolved_at)
+    cached = getattr(ticket, '_sla_status_cache', None)
+    if cached is not None and cached[0] == cache_key:
+        return cached[1]
+
+    sla_status = _compute_sla_status(ticket, now)
+    ticket._sla_status_cache = (cache_key, sla_status)
+    return sla_status
+
+
+def _compute_sla_status(ticket, now):
+    target_hours = get_sla_target(ticket.priority)
+
+    # Closed tickets carry the outcome frozen at close time
+    if ticket.status == 'CLOSED' and ticket.sla_final_hours is not None:
+        is_overdue = ticket.sla_final_overdue
+        return SlaStatus(
+            target_hours=target_hours,
+            elapsed_hours=ticket.sla_final_hours,
+            remaining_hours=target_hours - ticket.sla_final_hours,
+            is_overdue=is_overdue,
+            status_class='sla-overdue' if is_overdue else 'sla-ok',
+            display_text=format_sla_time(ticket.sla_final_hours, is_resolved=True, is_overdue=is_overdue)
+        )
 
     # For resolved or closed tickets
-    if ticket.status in ['RESOLVED', 'CLOSED']:
+    if ticket.status in RESOLVED_STATUSES:
         if ticket.resolved_at:
             elapsed_seconds = (ticket.resolved_at - ticket.created_at).total_seconds()
             elapsed_hours = elapsed_seconds / 3600
             is_overdue = elapsed_hours > target_hours
             remaining_hours = target_hours - elapsed_hours
 
-            return {
-                'target_hours': target_hours,
-                'elapsed_hours': elapsed_hours,
-                'remaining_hours': remaining_hours,
-                'is_overdue': is_overdue,
-                'status_class': 'sla-overdue' if is_overdue else 'sla-ok',
-                'display_text': format_sla_time(elapsed_hours, is_resolved=True, is_overdue=is_overdue)
-            }
-
-    # For open or in-progress tickets
-    elapsed_seconds = (datetime.utcnow() - ticket.created_at).total_seconds()
-    elapsed_hours = elapsed_seconds / 3600
-    remaining_hours = target_hours - elapsed_hours
+            return SlaStatus(
+                target_hours=target_hours,
+                elapsed_hours=elapsed_hours,
+                remaining_hours=remaining_hours,
+                is_overdue=is_overdue,
+                status_class='sla-overdue' if is_overdue else 'sla-ok',
+                display_text=format_sla_time(elapsed_hours, is_resolved=True, is_overdue=is_overdue)
+            )
+
+    # For open or in-progress tickets, count down to the stored deadline;
+    # derive it for tickets not flushed yet (set by the before_insert hook)
+    deadline = ticket.sla_deadline or ticket.created_at + timedelta(hours=target_hours)
+    remaining_hours = (deadline - now).total_seconds() / 3600
+    elapsed_hours = target_hours - remaining_hours
     is_overdue = remaining_hours < 0
 
     # Determine status class
@@ -52,14 +121,31 @@ def calculate_sla_status(ticket):
     else:
         status_class = 'sla-ok'
 
-    return {
-        'target_hours': target_hours,
-        'elapsed_hours': elapsed_hours,
-        'remaining_hours': remaining_hours,
-        'is_overdue': is_overdue,
-        'status_class': status_class,
-        'display_text': format_sla_time(abs(remaining_hours), is_resolved=False, is_overdue=is_overdue)
-    }
+    return SlaStatus(
+        target_hours=target_hours,
+        elapsed_hours=elapsed_hours,
+        remaining_hours=remaining_hours,
+        is_overdue=is_overdue,
+        status_class=status_class,
+        display_text=format_sla_time(abs(remaining_hours), is_resolved=False, is_overdue=is_overdue)
+    )
+
+
+def calculate_sla_statuses(tickets, now=None):
+    """
+    Calculate SLA status for a batch of tickets against one reference time
+
+    Args:
+        tickets: Iterable of Ticket model instances
+        now: Reference time (naive UTC), defaults to the current time
+
+    Returns:
+        list: SlaStatus objects (see calculate_sla_status), in ticket order
+    """
+    # Each ticket in a batch is computed exactly once, so skip the
+    # per-instance memo and call the arithmetic directly
+    now = now or request_now()
+    return [_compute_sla_status(ticket, now) for ticket in tickets]
 
 
 def format_sla_time(hours, is_resolved=False, is_overdue=False):
@@ -103,15 +189,7 @@ def validate_status_transition(current_status, new_status):
     Returns:
         bool: True if transition is valid, False otherwise
     """
-    valid_transitions = {
-        'OPEN': ['IN_PROGRESS'],
-        'IN_PROGRESS': ['OPEN', 'RESOLVED'],
-        'RESOLVED': ['IN_PROGRESS', 'CLOSED'],
-        'CLOSED': []  # Final state, no transitions allowed
-    }
-
-    allowed_statuses = valid_transitions.get(current_status, [])
-    return new_status in allowed_statuses
+    return new_status in STATUS_TRANSITIONS.get(current_status, ())
 
 
 def update_ticket_status(ticket_id, new_status, user):
@@ -130,10 +208,104 @@ def update_ticket_status(ticket_id, new_status, user):
         ValueError: If transition is invalid
         PermissionError: If user doesn't have permission
     """
-    ticket = Ticket.query.get_or_404(ticket_id)
-  	# 🔒 HARD LOCK: CLOSED tickets are immutable
+    # Lock the row for the rest of the transaction; with_for_update also
+    # bypasses the identity map, so the checks below see current values.
+    # Only the columns the checks and the update read are fetched.
+    ticket = db.session.get(
+        Ticket, ticket_id,
+        options=[
+            load_only(Ticket.status, Ticket.created_by, Ticket.resolved_at, Ticket.is_deleted),
+            *strict_loading()
+        ],
+        with_for_update=True
+    )
+    if ticket is None or ticket.is_deleted:
+        abort(404)
+
+    _check_status_update(ticket, new_status, user)
+
+    # Every rule below is evaluated against the status before this update
+    old_status = ticket.status
+
+    # Update status, guarded on the status that was validated above so a
+    # concurrent change makes this write a no-op instead of overwriting it
+    values = _status_update_values(ticket, new_status, datetime.utcnow())
+    if guarded_ticket_update(ticket_id, [Ticket.status == old_status], values) is None:
+        raise ValueError("Ticket was changed by another request. Reload and try again.")
+
+    db.session.commit()
+    return ticket
+
+
+def update_ticket_status_bulk(ticket_ids, new_status, user):
+    """
+    Move many tickets to one status with a single locking SELECT
+
+    Applies the same rules as update_ticket_status to every ticket;
+    soft-deleted tickets count as not found. Tickets that fail a rule are
+    reported instead of aborting the batch.
+    Tickets that need the same column values share one UPDATE, so a batch
+    issues at most a few UPDATEs and one commit.
+
+    Args:
+        ticket_ids: IDs of tickets to update
+        new_status: Target status
+        user: User performing the update
+
+    Returns:
+        dict: Batch outcome with keys:
+            - updated: IDs of tickets moved to new_status
+            - errors: Error message by ticket ID for tickets left unchanged
+            - affected_users: Creator and assignee IDs of updated tickets
+    """
+    tickets = db.session.execute(
+        select(Ticket)
+        .options(*strict_loading())
+        .where(Ticket.id.in_(ticket_ids), ticket_is_active())
+        .with_for_update()
+    ).scalars().all()
+
+    found = {ticket.id: ticket for ticket in tickets}
+    errors = {ticket_id: "Ticket not found." for ticket_id in ticket_ids if ticket_id not in found}
+
+    # Group by everything _status_update_values depends on
+    groups = {}
+    for ticket in tickets:
+        try:
+            _check_status_update(ticket, new_status, user)
+        except (ValueError, PermissionError) as e:
+            errors[ticket.id] = str(e)
+            continue
+        groups.setdefault((ticket.status, ticket.resolved_at is None), []).append(ticket)
+
+    now = datetime.utcnow()
+    updated = []
+    affected_users = set()
+    for (old_status, _), group in groups.items():
+        rows = db.session.execute(
+            update(Ticket)
+            .where(Ticket.id.in_([ticket.id for ticket in group]), Ticket.status == old_status)
+            .values(**_status_update_values(group[0], new_status, now))
+            .returning(Ticket.id, Ticket.created_by, Ticket.assigned_to)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for row in rows:
+            updated.append(row.id)
+            affected_users.update((row.created_by, row.assigned_to))
+
+    missed = {ticket.id for group in groups.values() for ticket in group} - set(updated)
+    for ticket_id in missed:
+        errors[ticket_id] = "Ticket was changed by another request. Reload and try again."
+
+    db.session.commit()
+    affected_users.discard(None)
+    return {'updated': updated, 'errors': errors, 'affected_users': affected_users}
+
+
+def _check_status_update(ticket, new_status, user):
+    # 🔒 HARD LOCK: CLOSED tickets are immutable
     if ticket.status == 'CLOSED':
-    	raise ValueError("Closed tickets cannot be modified.")
+        raise ValueError("Closed tickets cannot be modified.")
 
     # Check permissions
     if not (user.is_admin() or user.is_agent() or ticket.created_by == user.id):
@@ -143,19 +315,46 @@ def update_ticket_status(ticket_id, new_status, user):
     if not validate_status_transition(ticket.status, new_status):
         raise ValueError(f"Invalid status transition from {ticket.status} to {new_status}")
 
-    # Update status
-    ticket.status = new_status
+
+def _status_update_values(ticket, new_status, now):
+    values = {'status': new_status}
 
     # Set resolved_at timestamp when moving to RESOLVED
     if new_status == 'RESOLVED' and ticket.resolved_at is None:
-        ticket.resolved_at = datetime.utcnow()
-
+        values['resolved_at'] = now
     # Clear resolved_at when reopening from RESOLVED
-    if new_status == 'IN_PROGRESS' and ticket.status == 'RESOLVED':
-        ticket.resolved_at = None
+    elif new_status == 'IN_PROGRESS' and ticket.status == 'RESOLVED':
+        values['resolved_at'] = None
+    # Freeze the SLA outcome when closing
+    elif new_status == 'CLOSED':
+        values.update(closed_sla_values())
 
-    db.session.commit()
-    return ticket
+    return values
+
+
+def guarded_ticket_update(ticket_id, criteria, values):
+    """
+    Update a ticket only if it still matches the given criteria
+
+    The invariant lives in the UPDATE's WHERE clause, so checking and
+    writing happen in one statement with no read-modify-write race.
+    The caller commits.
+
+    Args:
+        ticket_id: ID of ticket to update
+        criteria: Extra WHERE conditions the row must satisfy
+        values: Column values to set
+
+    Returns:
+        Row: created_by and assigned_to of the updated ticket, or None if no row matched
+    """
+    return db.session.execute(
+        update(Ticket)
+        .where(Ticket.id == ticket_id, *criteria)
+        .values(**values)
+        .returning(Ticket.created_by, Ticket.assigned_to)
+        .execution_options(synchronize_session=False)
+    ).first()
 
 
 def can_user_view_ticket(ticket, user):
@@ -181,48 +380,102 @@ def can_user_view_ticket(ticket, user):
     return ticket.created_by == user.id
 
 
+@lru_cache(maxsize=64)
+def _split_statuses(value):
+    # The status filter arrives as the same few comma-joined strings
+    return tuple(value.split(','))
+
+
+# Ticket list filters: query-string key -> function(query, value) returning the filtered query.
+# Keyset cursors ('after' / 'before') are applied separately, after these.
+_FILTER_APPLIERS = {
+    'status': lambda query, value: query.filter(Ticket.status.in_(_split_statuses(value))),
+    'priority': lambda query, value: query.filter_by(priority=value),
+    'category': lambda query, value: query.filter_by(category=value),
+    'assigned_to': lambda query, value: query.filter_by(assigned_to=value),
+    'created_by': lambda query, value: query.filter_by(created_by=value),
+    # SLA breach is evaluated by the database, so it filters and
+    # paginates without loading the tickets that are within SLA
+    'overdue': lambda query, value: query.filter(Ticket.is_overdue()),
+}
+
+
 def get_user_tickets(user, filters=None):
     """
     Get tickets visible to user with optional filters
 
     Args:
         user: User model instance
-        filters: Dictionary of filter criteria
+        filters: Dictionary of filter criteria. Keyset cursors go in
+            'after' / 'before' as (created_at, id) tuples, see decode_ticket_cursor
 
     Returns:
-        Query: Filtered ticket query
+        Query: Filtered ticket query, newest first; oldest first when
+            paging with 'before' (the caller reverses that page)
     """
     # Base query depends on user role
+    # Soft-deleted tickets are hidden from every role
     if user.is_admin():
-        query = Ticket.query
+        query = active_tickets()
     elif user.is_agent():
-        # Agents see assigned tickets + unassigned tickets
-        query = Ticket.query.filter(
-            db.or_(
-                Ticket.assigned_to == user.id,
-                Ticket.assigned_to == None
-            )
+        # Agents see assigned tickets + unassigned tickets. The two sets are
+        # disjoint, so UNION ALL lets each branch use its own index
+        # (assignee vs unassigned pool) instead of one OR scan.
+        query = active_tickets().filter(Ticket.assigned_to == user.id).union_all(
+            active_tickets().filter(Ticket.assigned_to.is_(None))
         )
     else:
         # Users see only their own tickets
-        query = Ticket.query.filter_by(created_by=user.id)
+        query = active_tickets().filter_by(created_by=user.id)
 
-    # Apply filters if provided
+    # Apply filters if provided; only keys actually present are visited
     if filters:
-        if filters.get('status'):
-            statuses = filters['status'].split(',')
-            query = query.filter(Ticket.status.in_(statuses))
+        for key, value in filters.items():
+            applier = _FILTER_APPLIERS.get(key)
+            if applier and value:
+                query = applier(query, value)
+
+    # Keyset pagination: seek past the cursor row on the (created_at, id)
+    # sort key, so each page is an index range scan instead of an OFFSET
+    sort_key = tuple_(Ticket.created_at, Ticket.id)
+    if filters and filters.get('before'):
+        query = query.filter(sort_key > tuple_(*filters['before']))
+        return query.order_by(Ticket.created_at.asc(), Ticket.id.asc())
+
+    if filters and filters.get('after'):
+        query = query.filter(sort_key < tuple_(*filters['after']))
+
+    # id breaks created_at ties so pages never overlap or skip rows
+    return query.order_by(Ticket.created_at.desc(), Ticket.id.desc())
+
+
+def encode_ticket_cursor(ticket):
+    """
+    Build a keyset pagination cursor for a ticket list row
 
-        if filters.get('priority'):
-            query = query.filter_by(priority=filters['priority'])
+    Args:
+        ticket: Ticket model instance
 
-        if filters.get('category'):
-            query = query.filter_by(category=filters['category'])
+    Returns:
+        str: Cursor of the form '<created_at ISO>_<id>'
+    """
+    return f'{ticket.created_at.isoformat()}_{ticket.id}'
 
-        if filters.get('assigned_to'):
-            query = query.filter_by(assigned_to=filters['assigned_to'])
 
-        if filters.get('created_by'):
-            query = query.filter_by(created_by=filters['created_by'])
+def decode_ticket_cursor(value):
+    """
+    Parse a cursor produced by encode_ticket_cursor
 
-    return query.order_by(Ticket.created_at.desc())
+    Args:
+        value: Cursor string from the query string
+
+    Returns:
+        tuple or None: (created_at, id), or None if missing or malformed
+    """
+    if not value:
+        return None
+    created_at, _, ticket_id = value.rpartition('_')
+    try:
+        return datetime.fromisoformat(created_at), int(ticket_id)
+    except ValueError:
+        return None
@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+__all__ = ["config", "BaseConfig", "DevelopmentConfig", "ProductionConfig"]
+
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
 
@@ -12,6 +14,17 @@ class BaseConfig:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Raise on lazy relationship loads in queries that opt in via strict_loading()
+    SQLALCHEMY_RAISELOAD = False
+
+    # Create tables and seed users when the app is created (see `flask init-db`)
+    AUTO_INIT_DB = True
+
+    # Caching (per-process by default; set CACHE_TYPE=RedisCache to share across workers)
+    CACHE_TYPE = os.environ.get("CACHE_TYPE", "SimpleCache")
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+    CACHE_DEFAULT_TIMEOUT = 300
+
     # Session / security
     SESSION_COOKIE_NAME = "servcore_session"
     SESSION_COOKIE_HTTPONLY = True
@@ -25,7 +38,9 @@ class DevelopmentConfig(BaseConfig):
     """
 
     DEBUG = True
-    SQLALCHEMY_ECHO = True
+    # Statement logging is opt-in: SQL_ECHO=1
+    SQLALCHEMY_ECHO = os.environ.get("SQL_ECHO") == "1"
+    SQLALCHEMY_RAISELOAD = True
     SESSION_COOKIE_SECURE = False
 
     # Explicit SQLite path (inside instance/)
@@ -43,6 +58,22 @@ class ProductionConfig(BaseConfig):
     SQLALCHEMY_ECHO = False
     SESSION_COOKIE_SECURE = True
 
+    # Connection pool: validate connections on checkout, recycle before
+    # server-side idle timeouts, and reuse the most recently returned ones.
+    # Size per worker process with DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 20)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_use_lifo": True,
+        # Label connections in pg_stat_activity and cap runaway statements
+        "connect_args": {
+            "application_name": "servcore",
+            "options": "-c statement_timeout=" + os.environ.get("DB_STATEMENT_TIMEOUT_MS", "5000"),
+        },
+    }
+
     @staticmethod
     def init_app(app):
         # Hard fail if secrets are missing
@@ -0,0 +1,97 @@
+"""add ticket soft delete and stored SLA columns
+
+Adds tickets.is_deleted, tickets.sla_deadline, tickets.sla_final_overdue
+and tickets.sla_final_hours to a tickets table created before these
+columns existed, and backfills the stored SLA values.
+
+Revision ID: 3f6c2a9d1b7e
+Revises:
+Create Date: 2026-10-14 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d1b7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SLA targets at the time of this revision (app.models.SLA_TARGET_HOURS),
+# frozen so later edits to the model don't change what the backfill wrote
+SLA_TARGET_HOURS = {'Critical': 4, 'High': 24, 'Medium': 48, 'Low': 72}
+DEFAULT_SLA_TARGET = 72
+
+
+def _deadline_sql(dialect, hours):
+    """SQL expression for created_at plus a whole number of hours"""
+    if dialect == 'sqlite':
+        # SQLAlchemy stores 'YYYY-MM-DD HH:MM:SS.ffffff'; strftime drops the
+        # microseconds, so the original fraction is appended back
+        return f"strftime('%Y-%m-%d %H:%M:%S', created_at, '+{hours} hours') || substr(created_at, 20)"
+    return f"created_at + interval '{hours} hours'"
+
+
+def _elapsed_seconds_sql(dialect):
+    """SQL expression for the seconds between created_at and resolved_at"""
+    if dialect == 'sqlite':
+        return '(julianday(resolved_at) - julianday(created_at)) * 86400'
+    return 'extract(epoch from resolved_at - created_at)'
+
+
+def _backfill_sla():
+    """Fill sla_deadline for every row, and the frozen outcome of CLOSED rows"""
+    dialect = op.get_bind().dialect.name
+
+    # One UPDATE per priority, then the default target for anything else
+    for priority, hours in SLA_TARGET_HOURS.items():
+        op.execute(sa.text(
+            f'UPDATE tickets SET sla_deadline = {_deadline_sql(dialect, hours)} '
+            'WHERE priority = :priority'
+        ).bindparams(priority=priority))
+    op.execute(
+        f'UPDATE tickets SET sla_deadline = {_deadline_sql(dialect, DEFAULT_SLA_TARGET)} '
+        'WHERE sla_deadline IS NULL'
+    )
+
+    # Resolution time is rounded to whole seconds, as the app stores it
+    op.execute(
+        'UPDATE tickets SET '
+        'sla_final_overdue = resolved_at > sla_deadline, '
+        f'sla_final_hours = round({_elapsed_seconds_sql(dialect)}) / 3600.0 '
+        "WHERE status = 'CLOSED' AND resolved_at IS NOT NULL"
+    )
+
+
+def upgrade():
+    # The server default fills existing rows, so NOT NULL holds immediately
+    op.add_column('tickets', sa.Column('is_deleted', sa.Boolean(), nullable=False,
+                                       server_default=sa.false()))
+    op.add_column('tickets', sa.Column('sla_final_overdue', sa.Boolean(), nullable=True))
+    op.add_column('tickets', sa.Column('sla_final_hours', sa.Float(), nullable=True))
+
+    # Nullable first, backfill, then NOT NULL
+    op.add_column('tickets', sa.Column('sla_deadline', sa.DateTime(), nullable=True))
+    _backfill_sla()
+    with op.batch_alter_table('tickets') as batch_op:
+        batch_op.alter_column('sla_deadline', existing_type=sa.DateTime(), nullable=False)
+
+    # Created after the batch step, which on SQLite copies the table
+    open_ticket = sa.and_(
+        sa.not_(sa.column('status').in_(('RESOLVED', 'CLOSED'))),
+        sa.column('is_deleted') == sa.false()
+    )
+    op.create_index('ix_tickets_sla_deadline_open', 'tickets', ['sla_deadline'],
+                    postgresql_where=open_ticket, sqlite_where=open_ticket)
+
+
+def downgrade():
+    op.drop_index('ix_tickets_sla_deadline_open', table_name='tickets')
+
+    with op.batch_alter_table('tickets') as batch_op:
+        batch_op.drop_column('sla_deadline')
+        batch_op.drop_column('sla_final_hours')
+        batch_op.drop_column('sla_final_overdue')
+        batch_op.drop_column('is_deleted')
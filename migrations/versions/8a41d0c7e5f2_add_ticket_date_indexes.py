@@ -0,0 +1,30 @@
+"""add ticket date indexes
+
+Indexes behind the date-ordered ticket lists and the per-agent resolution
+statistics.
+
+Revision ID: 8a41d0c7e5f2
+Revises: 3f6c2a9d1b7e
+Create Date: 2026-10-14 12:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41d0c7e5f2'
+down_revision = '3f6c2a9d1b7e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tickets_created_at', 'tickets', ['created_at'])
+    op.create_index('ix_tickets_resolved_at', 'tickets', ['resolved_at'])
+    op.create_index('ix_tickets_assigned_to_resolved_at', 'tickets', ['assigned_to', 'resolved_at'])
+
+
+def downgrade():
+    op.drop_index('ix_tickets_assigned_to_resolved_at', table_name='tickets')
+    op.drop_index('ix_tickets_resolved_at', table_name='tickets')
+    op.drop_index('ix_tickets_created_at', table_name='tickets')
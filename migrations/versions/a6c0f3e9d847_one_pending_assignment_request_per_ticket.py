@@ -0,0 +1,41 @@
+"""allow one pending assignment request per ticket
+
+Adds the partial unique index uq_ticket_pending_request. Databases that
+predate it may already hold several PENDING requests for one ticket, so
+all but the oldest of those (lowest id, ids being assigned in insert
+order) are removed first.
+
+Revision ID: a6c0f3e9d847
+Revises: f1d6a7b40c58
+Create Date: 2026-10-14 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c0f3e9d847'
+down_revision = 'f1d6a7b40c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        'DELETE FROM assignment_requests '
+        "WHERE status = 'PENDING' AND EXISTS ("
+        'SELECT 1 FROM assignment_requests AS older '
+        'WHERE older.ticket_id = assignment_requests.ticket_id '
+        "AND older.status = 'PENDING' "
+        'AND older.id < assignment_requests.id)'
+    )
+
+    pending = sa.text("status = 'PENDING'")
+    op.create_index('uq_ticket_pending_request', 'assignment_requests', ['ticket_id'],
+                    unique=True, postgresql_where=pending, sqlite_where=pending)
+
+
+def downgrade():
+    # The removed duplicate requests are not restored
+    op.drop_index('uq_ticket_pending_request', table_name='assignment_requests')
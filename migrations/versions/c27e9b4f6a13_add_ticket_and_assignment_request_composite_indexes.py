@@ -0,0 +1,40 @@
+"""add ticket and assignment request composite indexes
+
+Composite indexes behind the owner and assignee ticket lists, the agent
+dashboard queue and the pending assignment request lookups.
+
+Revision ID: c27e9b4f6a13
+Revises: 8a41d0c7e5f2
+Create Date: 2026-10-14 12:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27e9b4f6a13'
+down_revision = '8a41d0c7e5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    not_deleted = sa.column('is_deleted') == sa.false()
+    op.create_index('ix_tickets_created_by_created_at', 'tickets', ['created_by', 'created_at', 'id'],
+                    postgresql_where=not_deleted, sqlite_where=not_deleted)
+    op.create_index('ix_tickets_assigned_to_created_at', 'tickets', ['assigned_to', 'created_at', 'id'])
+    op.create_index('ix_tickets_status_assigned_created', 'tickets', ['status', 'assigned_to', 'created_at'],
+                    postgresql_where=not_deleted, sqlite_where=not_deleted)
+
+    op.create_index('ix_assignment_requests_agent_status', 'assignment_requests', ['agent_id', 'status'])
+    op.create_index('ix_assignment_requests_ticket_status', 'assignment_requests', ['ticket_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_assignment_requests_ticket_status', table_name='assignment_requests')
+    op.drop_index('ix_assignment_requests_agent_status', table_name='assignment_requests')
+
+    op.drop_index('ix_tickets_status_assigned_created', table_name='tickets')
+    op.drop_index('ix_tickets_assigned_to_created_at', table_name='tickets')
+    op.drop_index('ix_tickets_created_by_created_at', table_name='tickets')
@@ -0,0 +1,28 @@
+"""replace the comment ticket index with (ticket_id, created_at)
+
+The composite index serves a ticket's comment thread in creation order
+and every ticket_id lookup, so the single-column index is dropped.
+
+Revision ID: d94b1e8c3f70
+Revises: c27e9b4f6a13
+Create Date: 2026-10-14 12:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd94b1e8c3f70'
+down_revision = 'c27e9b4f6a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_comments_ticket_id_created_at', 'comments', ['ticket_id', 'created_at'])
+    op.drop_index('ix_comments_ticket_id', table_name='comments')
+
+
+def downgrade():
+    op.create_index('ix_comments_ticket_id', 'comments', ['ticket_id'])
+    op.drop_index('ix_comments_ticket_id_created_at', table_name='comments')
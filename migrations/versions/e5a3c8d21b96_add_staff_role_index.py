@@ -0,0 +1,29 @@
+"""add partial index on staff user roles
+
+Revision ID: e5a3c8d21b96
+Revises: d94b1e8c3f70
+Create Date: 2026-10-14 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a3c8d21b96'
+down_revision = 'd94b1e8c3f70'
+branch_labels = None
+depends_on = None
+
+# app.models.STAFF_ROLES at the time of this revision
+STAFF_ROLES = ('agent', 'admin')
+
+
+def upgrade():
+    staff = sa.column('role').in_(STAFF_ROLES)
+    op.create_index('ix_users_role_staff', 'users', ['role'],
+                    postgresql_where=staff, sqlite_where=staff)
+
+
+def downgrade():
+    op.drop_index('ix_users_role_staff', table_name='users')
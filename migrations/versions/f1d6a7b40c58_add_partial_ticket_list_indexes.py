@@ -0,0 +1,34 @@
+"""add partial status and unassigned ticket list indexes
+
+Both indexes leave out soft-deleted rows, which the list queries never
+read.
+
+Revision ID: f1d6a7b40c58
+Revises: e5a3c8d21b96
+Create Date: 2026-10-14 12:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1d6a7b40c58'
+down_revision = 'e5a3c8d21b96'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    not_deleted = sa.column('is_deleted') == sa.false()
+    op.create_index('ix_tickets_status_created', 'tickets', ['status', 'created_at', 'id'],
+                    postgresql_where=not_deleted, sqlite_where=not_deleted)
+
+    unassigned = sa.and_(sa.column('assigned_to').is_(None), not_deleted)
+    op.create_index('ix_tickets_unassigned', 'tickets', ['created_at', 'id'],
+                    postgresql_where=unassigned, sqlite_where=unassigned)
+
+
+def downgrade():
+    op.drop_index('ix_tickets_unassigned', table_name='tickets')
+    op.drop_index('ix_tickets_status_created', table_name='tickets')